@@ -0,0 +1,20 @@
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.rag.engine import rag_ready
+from app.rag.metrics import scrape_registry
+
+fastapi_app = FastAPI()
+
+
+@fastapi_app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the RAG engine has finished warming up."""
+    is_ready = rag_ready()
+    return JSONResponse({"ready": is_ready}, status_code=200 if is_ready else 503)
+
+
+@fastapi_app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint; see scrape_registry for multi-worker servers."""
+    return Response(generate_latest(scrape_registry()), media_type=CONTENT_TYPE_LATEST)
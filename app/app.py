@@ -6,8 +6,10 @@ from app.pages.modest_means import modest_means
 from app.pages.disclaimer import disclaimer
 from app.pages.privacy_policy import privacy_policy
 from app.pages.minerva import minerva
-from app.states.chat_state import ChatState
+from app.states.chat_state import ChatState, PROMPTS
 from app.components.layout import layout
+from app.rag.engine import load_rag_engine
+from app.api import fastapi_app
 
 app = rx.App(
     theme=rx.theme(appearance="light"),
@@ -22,8 +24,11 @@ app = rx.App(
         rx.el.script(
             src="https://assets.calendly.com/assets/external/widget.js", async_=True
         ),
+        rx.el.script(src="/prompt_cycle.js", async_=True),
     ],
+    api_transformer=fastapi_app,
 )
+app.register_lifespan_task(load_rag_engine, warm_up_queries=PROMPTS)
 app.add_page(index)
 app.add_page(minerva, route="/minerva")
 app.add_page(profile, route="/profile")
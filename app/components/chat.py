@@ -1,5 +1,6 @@
+import json
 import reflex as rx
-from app.states.chat_state import ChatState, Message
+from app.states.chat_state import ChatState, Message, PROMPTS, DISCLAIMER, GREETING
 from reflex.components.radix.themes.base import Theme
 
 # Modern color palette
@@ -9,7 +10,7 @@ border_color = "#E5E7EB"  # Lighter gray for subtle borders
 user_bubble_bg = "rgba(229, 231, 235, 0.7)" # A slightly more opaque user bubble
 ai_bubble_bg = "rgba(243, 244, 246, 0.7)" # A very light gray for the AI bubble
 
-def message_bubble(message: Message) -> rx.Component:
+def bubble(content: rx.Component, is_user: rx.Var[bool] | bool) -> rx.Component:
     """A component to display a single chat message with a modern look."""
     
     # Common styles for the message text container
@@ -22,7 +23,7 @@ def message_bubble(message: Message) -> rx.Component:
     return rx.el.div(
         rx.el.div(
             rx.cond(
-                message["is_user"],
+                is_user,
                 # Empty fragment for user messages
                 rx.fragment(),
                 # Larger, styled logo for AI messages
@@ -35,14 +36,10 @@ def message_bubble(message: Message) -> rx.Component:
                 ),
             ),
             rx.el.div(
-                # Use a component map to disable TeX math rendering for dollar signs
-                rx.markdown(
-                    message["text"],
-                    component_map={"span": lambda text: rx.el.span(text)},
-                ),
+                content,
                 # Apply conditional background colors
                 bg=rx.cond(
-                    message["is_user"], user_bubble_bg, ai_bubble_bg
+                    is_user, user_bubble_bg, ai_bubble_bg
                 ),
                 # Apply shared bubble styles and specific border styles
                 style=bubble_style,
@@ -52,12 +49,51 @@ def message_bubble(message: Message) -> rx.Component:
             class_name="flex items-start gap-4",
         ),
         # Align the entire message bubble to the right for the user, left for the AI
-        class_name=rx.cond(message["is_user"], "self-end justify-end", "self-start"),
+        # chat-message lets the browser skip laying out bubbles scrolled out of view
+        class_name=rx.cond(
+            is_user, "chat-message self-end justify-end", "chat-message self-start"
+        ),
         width="100%",
         display="flex",
     )
 
 
+def markdown_text(text: rx.Var[str] | str) -> rx.Component:
+    # Use a component map to disable TeX math rendering for dollar signs
+    return rx.markdown(text, component_map={"span": lambda text: rx.el.span(text)})
+
+
+@rx.memo
+def markdown_block(text: str) -> rx.Component:
+    """A finished block of a streaming answer, parsed once and never again."""
+    return markdown_text(text)
+
+
+@rx.memo
+def chat_message(text: str, is_user: bool) -> rx.Component:
+    """A completed message; memoized so new messages never re-render it."""
+    return bubble(markdown_text(text), is_user)
+
+
+def message_bubble(message: Message) -> rx.Component:
+    # Keyed by seq, not list position, so trimming the window or prepending
+    # earlier pages leaves the memoized bubbles untouched
+    return chat_message(
+        text=message["text"], is_user=message["is_user"], key=message["seq"]
+    )
+
+
+def streaming_bubble() -> rx.Component:
+    """The in-progress answer, where only the open trailing block is re-parsed."""
+    return bubble(
+        rx.fragment(
+            rx.foreach(ChatState.stream_blocks, lambda block: markdown_block(text=block)),
+            markdown_text(ChatState.stream_tail),
+        ),
+        False,
+    )
+
+
 def chat_interface() -> rx.Component:
     """The main chat interface component with a sleek and modern design."""
     return rx.el.div(
@@ -67,11 +103,28 @@ def chat_interface() -> rx.Component:
             color=text_color,
         ),
         rx.el.p(
-            ChatState.messages[0]["text"],
+            DISCLAIMER,
             class_name="text-xs text-center text-gray-500 mb-4 px-6",
         ),
         rx.el.div(
-            rx.foreach(ChatState.messages[1:], message_bubble),
+            rx.cond(
+                ChatState.has_earlier,
+                rx.el.button(
+                    "Show earlier messages",
+                    on_click=ChatState.load_earlier,
+                    class_name=f"self-center text-xs text-[{accent_color}] hover:underline",
+                ),
+                chat_message(text=GREETING, is_user=False),
+            ),
+            rx.foreach(ChatState.earlier_messages, message_bubble),
+            rx.foreach(ChatState.messages, message_bubble),
+            # The in-progress answer lives in its own vars so each streamed
+            # update sends just the open block, not the whole message list
+            rx.cond(
+                (ChatState.stream_tail != "") | (ChatState.stream_blocks.length() > 0),
+                streaming_bubble(),
+                rx.fragment(),
+            ),
             class_name="flex flex-col gap-4 p-4 h-[32rem] overflow-y-auto",
             id="chat-history" # Added an ID for potential future use (e.g., auto-scrolling)
         ),
@@ -88,11 +141,13 @@ def chat_interface() -> rx.Component:
             rx.el.input(
                 id="question_input",
                 name="question",
-                placeholder=ChatState.current_prompt_display,
-                on_key_down=ChatState.handle_key_down,
+                # assets/prompt_cycle.js rotates the placeholder and handles Tab
+                placeholder=f"{PROMPTS[0]} →[Tab]" if PROMPTS else "Ask your question here...",
+                custom_attrs={
+                    "data-prompts": json.dumps(PROMPTS),
+                    "data-prompt": PROMPTS[0] if PROMPTS else "",
+                },
                 class_name=f"w-full bg-transparent focus:outline-none font-medium text-sm text-[{text_color}] placeholder:text-gray-400 placeholder:italic",
-                default_value=ChatState.question_input,
-                key=ChatState.question_input,
             ),
             rx.el.button(
                 rx.icon("send", size=20, class_name=f"text-[{accent_color}]"),
@@ -1,22 +1,49 @@
 import os
 import re
+import json
+import hashlib
 import pdfplumber
 import PyPDF4
-from typing import Callable
+from typing import Callable, Iterator
 from docx import Document as DocxDocument
 import extract_msg
 import email
 from langchain.docstore.document import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
 import time
 import logging
+import itertools
+import queue
+import threading
+from app.rag.config import BM25_INDEX_DIR, CHROMA_DIR, NUMPY_INDEX_DIR
+from app.rag.embedding_cache import get_embedding_cache
+from app.rag.embedding_scheduler import EmbeddingScheduler
+from app.rag.bm25 import VOCAB_FILE, build_bm25_index
+from app.rag.parent_store import ParentStore
+from app.rag.metrics import (
+    INGEST_CHUNKS,
+    INGEST_FILES,
+    INGEST_STAGE_SECONDS,
+    write_ingest_textfile,
+)
+from app.rag.vector_index import VECTORS_FILE, build_numpy_index, open_collection
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+MANIFEST_PATH = os.path.join(CHROMA_DIR, "ingest_manifest.json")
+CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.environ.get("INGEST_CHUNK_OVERLAP", "100"))
+PARENT_SIZE = int(os.environ.get("INGEST_PARENT_SIZE", "8000"))
+# Recorded per file in the manifest so changing the chunking re-ingests it.
+CHUNKING = f"{CHUNK_SIZE}/{CHUNK_OVERLAP}/{PARENT_SIZE}"
+# Carries a section's text from the worker to ChromaWriter on its first child
+# chunk; the writer moves it into the parent store before upserting.
+PARENT_TEXT_KEY = "parent_text"
+
 
 def read_docx(file_path: str) -> str:
     try:
@@ -176,95 +203,495 @@ def clean_text(pages: list[tuple[int, str]]) -> list[tuple[int, str]]:
 def text_to_docs(
     text: list[tuple[int, str]], metadata: dict[str, str], filename: str
 ) -> list[Document]:
+    """Splits pages into parent sections and those into small child chunks."""
     doc_chunks = []
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=30000,
-        separators=[
-            """
+    separators = [
+        """
 
 """,
-            """
+        """
 """,
-            ".",
-            "!",
-            "?",
-            ",",
-            " ",
-            "",
-        ],
-        chunk_overlap=3000,
+        ".",
+        "!",
+        "?",
+        ",",
+        " ",
+        "",
+    ]
+    section_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=PARENT_SIZE, separators=separators, chunk_overlap=0
+    )
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        separators=separators,
+        chunk_overlap=CHUNK_OVERLAP,
     )
     for page_num, page_content in text:
-        chunks = text_splitter.split_text(page_content)
-        for i, chunk in enumerate(chunks):
-            doc = Document(
-                page_content=chunk,
-                metadata={
-                    "page_number": page_num,
-                    "chunk": i,
-                    "source": f"p{page_num}-{i}",
-                    "filename": filename,
-                    **metadata,
-                },
-            )
-            doc_chunks.append(doc)
+        i = 0
+        for section, section_text in enumerate(
+            section_splitter.split_text(page_content)
+        ):
+            for section_chunk, chunk in enumerate(
+                text_splitter.split_text(section_text)
+            ):
+                doc = Document(
+                    page_content=chunk,
+                    metadata={
+                        "page_number": page_num,
+                        "chunk": i,
+                        "section": section,
+                        "source": f"p{page_num}-{i}",
+                        "filename": filename,
+                        **metadata,
+                    },
+                )
+                if section_chunk == 0:
+                    doc.metadata[PARENT_TEXT_KEY] = section_text
+                doc_chunks.append(doc)
+                i += 1
     return doc_chunks
 
 
-def process_files_in_batches(all_files: list[str], batch_size: int, api_key: str):
-    total_files = len(all_files)
-    for i in range(0, total_files, batch_size):
-        batch_files = all_files[i : i + batch_size]
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def path_key(file_path: str) -> str:
+    return hashlib.sha1(file_path.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_ids_for(file_path: str, document_chunks: list[Document]) -> list[str]:
+    """Stable per-path chunk IDs so a changed file's chunks can be replaced."""
+    key = path_key(file_path)
+    return [
+        f"{key}-p{doc.metadata['page_number']}-{doc.metadata['chunk']}"
+        for doc in document_chunks
+    ]
+
+
+def load_manifest(manifest_path: str = MANIFEST_PATH) -> dict[str, dict]:
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file).get("files", {})
+    except Exception as e:
+        logging.exception(f"Could not read ingest manifest {manifest_path}: {e}")
+        return {}
+
+
+def save_manifest(manifest: dict[str, dict], manifest_path: str = MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"version": 1, "files": manifest}, file)
+    os.replace(tmp_path, manifest_path)
+
+
+def plan_incremental_ingest(
+    all_files: list[str], manifest: dict[str, dict]
+) -> tuple[list[str], dict[str, dict], list[str]]:
+    """Splits the tree into files to (re)ingest and manifest paths that are gone."""
+    to_process = []
+    fingerprints = {}
+    for file_path in all_files:
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            logging.warning(f"Could not stat {file_path}: {e}")
+            continue
+        entry = manifest.get(file_path)
+        if entry and entry.get("chunking") != CHUNKING:
+            entry = None
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            continue
+        try:
+            content_hash = hash_file(file_path)
+        except OSError as e:
+            logging.warning(f"Could not hash {file_path}: {e}")
+            continue
+        if entry and entry["sha256"] == content_hash:
+            entry["size"] = stat.st_size
+            entry["mtime"] = stat.st_mtime
+            continue
+        fingerprints[file_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": content_hash,
+            "chunking": CHUNKING,
+        }
+        to_process.append(file_path)
+    present = set(all_files)
+    deleted = [file_path for file_path in manifest if file_path not in present]
+    return (to_process, fingerprints, deleted)
+
+
+def stale_chunk_ids(
+    file_chunk_ids: dict[str, list[str]], manifest: dict[str, dict] | None
+) -> list[str]:
+    """Chunk IDs a file had on its previous ingest that its new version lacks."""
+    if manifest is None:
+        return []
+    return [
+        chunk_id
+        for file_path, chunk_ids in file_chunk_ids.items()
+        for chunk_id in set(
+            manifest.get(file_path, {}).get("chunk_ids", [])
+        ).difference(chunk_ids)
+    ]
+
+
+def extract_document(file_path: str) -> tuple[str, list[Document] | None]:
+    """Parses, cleans and chunks one file; safe to run in a worker process."""
+    filename = os.path.basename(file_path)
+    logging.info(f"Processing File: {filename}...")
+    try:
+        _, extension = os.path.splitext(file_path)
+        if extension.lower() == ".pdf":
+            raw_pages, metadata = parse_pdf(file_path)
+        else:
+            raw_pages, metadata = ingest_non_pdf(file_path)
+        if not raw_pages:
+            logging.warning(f"No content extracted from {filename}. Skipping.")
+            return (file_path, [])
+        cleaned_pages = clean_text(raw_pages)
+        document_chunks = text_to_docs(cleaned_pages, metadata, filename)
+        key = path_key(file_path)
+        for doc, chunk_id in zip(
+            document_chunks, chunk_ids_for(file_path, document_chunks)
+        ):
+            doc.metadata["chunk_id"] = chunk_id
+            doc.metadata["parent_id"] = (
+                f"{key}-p{doc.metadata['page_number']}-s{doc.metadata['section']}"
+            )
+        logging.info(f"Extracted {len(document_chunks)} text chunks from {filename}.")
+        return (file_path, document_chunks)
+    except Exception as e:
+        logging.exception(
+            f"An unexpected error occurred while processing {filename}: {e}"
+        )
+        return (file_path, None)
+
+
+def iter_extracted_documents(
+    all_files: list[str], workers: int
+) -> Iterator[tuple[str, list[Document] | None]]:
+    """Yields extract_document results in input order from a process pool."""
+    for result in _extract_in_order(all_files, workers):
+        if result[1] is None:
+            INGEST_FILES.labels("parse_failed").inc()
+        yield result
+
+
+def _extract_in_order(
+    all_files: list[str], workers: int
+) -> Iterator[tuple[str, list[Document] | None]]:
+    if workers <= 1:
+        for file_path in all_files:
+            yield extract_document(file_path)
+        return
+    files = iter(all_files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            executor.submit(extract_document, file_path)
+            for file_path in itertools.islice(files, workers * 2)
+        )
+        while pending:
+            result = pending.popleft().result()
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.append(executor.submit(extract_document, next_file))
+            yield result
+
+
+class ChromaWriter:
+    """One open ultima-collection handle shared by a whole ingest run."""
+
+    def __init__(
+        self,
+        manifest: dict[str, dict] | None = None,
+        fingerprints: dict[str, dict] | None = None,
+        flush_every: int = 10,
+    ):
+        self.collection = open_collection()
+        self.parents = ParentStore()
+        self.manifest = manifest
+        self.fingerprints = fingerprints or {}
+        self.flush_every = max(1, flush_every)
+        self.files_written = 0
+        self._unflushed_writes = 0
+
+    def write(
+        self, file_chunks: list[tuple[str, list[Document]]], vectors: list[list[float]]
+    ):
+        docs = [doc for _, document_chunks in file_chunks for doc in document_chunks]
+        self.parents.replace_sources(
+            {
+                path_key(file_path): [
+                    (doc.metadata["parent_id"], doc.metadata.pop(PARENT_TEXT_KEY))
+                    for doc in document_chunks
+                    if PARENT_TEXT_KEY in doc.metadata
+                ]
+                for file_path, document_chunks in file_chunks
+            }
+        )
+        file_chunk_ids = {
+            file_path: [doc.metadata["chunk_id"] for doc in document_chunks]
+            for file_path, document_chunks in file_chunks
+        }
+        if docs:
+            self.collection.upsert(
+                ids=[doc.metadata["chunk_id"] for doc in docs],
+                embeddings=vectors,
+                documents=[doc.page_content for doc in docs],
+                metadatas=[doc.metadata for doc in docs],
+            )
+        stale_ids = stale_chunk_ids(file_chunk_ids, self.manifest)
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+        self.files_written += len(file_chunks)
+        INGEST_FILES.labels("written").inc(len(file_chunks))
+        INGEST_CHUNKS.inc(len(docs))
+        if self.manifest is None:
+            return
+        for file_path, chunk_ids in file_chunk_ids.items():
+            if file_path in self.fingerprints:
+                self.manifest[file_path] = {
+                    **self.fingerprints[file_path],
+                    "chunk_ids": chunk_ids,
+                }
+        self._unflushed_writes += 1
+        if self._unflushed_writes >= self.flush_every:
+            self.flush()
+
+    def delete_files(self, file_paths: list[str]):
+        stale_ids = [
+            chunk_id
+            for file_path in file_paths
+            for chunk_id in self.manifest[file_path].get("chunk_ids", [])
+        ]
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+        self.parents.delete_sources([path_key(file_path) for file_path in file_paths])
+        for file_path in file_paths:
+            del self.manifest[file_path]
         logging.info(
-            f"--- Processing Batch {i // batch_size + 1}/{(total_files + batch_size - 1) // batch_size} ---"
+            f"Removed {len(stale_ids)} chunks belonging to {len(file_paths)} deleted files."
         )
-        batch_document_chunks = []
-        for file_path in batch_files:
-            filename = os.path.basename(file_path)
-            logging.info(f"Processing File: {filename}...")
-            try:
-                _, extension = os.path.splitext(file_path)
-                if extension.lower() == ".pdf":
-                    raw_pages, metadata = parse_pdf(file_path)
-                else:
-                    raw_pages, metadata = ingest_non_pdf(file_path)
-                if not raw_pages:
-                    logging.warning(f"No content extracted from {filename}. Skipping.")
-                    continue
-                cleaned_pages = clean_text(raw_pages)
-                document_chunks = text_to_docs(cleaned_pages, metadata, filename)
-                batch_document_chunks.extend(document_chunks)
-                logging.info(
-                    f"Extracted {len(document_chunks)} text chunks from {filename}."
-                )
-            except Exception as e:
-                logging.exception(
-                    f"An unexpected error occurred while processing {filename}: {e}"
-                )
-        if not batch_document_chunks:
+
+    def delete_unmanaged_chunks(self, page_size: int = 5000) -> int:
+        """Removes chunks without a chunk_id, left by ingests before the manifest."""
+        unmanaged_ids = []
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["metadatas"], limit=page_size, offset=offset
+            )
+            unmanaged_ids.extend(
+                chunk_id
+                for chunk_id, metadata in zip(page["ids"], page["metadatas"])
+                if not (metadata or {}).get("chunk_id")
+            )
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+        for start in range(0, len(unmanaged_ids), page_size):
+            self.collection.delete(ids=unmanaged_ids[start : start + page_size])
+        return len(unmanaged_ids)
+
+    def flush(self):
+        if self.manifest is not None:
+            save_manifest(self.manifest)
+        self._unflushed_writes = 0
+
+
+def drop_failed_files(
+    file_chunks: list[tuple[str, list[Document]]],
+    vectors: list[list[float] | None],
+    failed: list[int],
+) -> tuple[list[tuple[str, list[Document]]], list[list[float]]]:
+    """Keeps only files whose every chunk was embedded."""
+    if not failed:
+        return (file_chunks, vectors)
+    failed_indices = set(failed)
+    kept_files = []
+    kept_vectors = []
+    offset = 0
+    for file_path, document_chunks in file_chunks:
+        indices = range(offset, offset + len(document_chunks))
+        offset += len(document_chunks)
+        if failed_indices.intersection(indices):
+            INGEST_FILES.labels("embed_failed").inc()
+            logging.warning(
+                f"Skipping {os.path.basename(file_path)}: embeddings failed for "
+                f"{len(failed_indices.intersection(indices))} of its chunks."
+            )
+            continue
+        kept_files.append((file_path, document_chunks))
+        kept_vectors.extend(vectors[i] for i in indices)
+    return (kept_files, kept_vectors)
+
+
+def process_files_in_batches(
+    all_files: list[str],
+    batch_size: int,
+    embedder: EmbeddingScheduler,
+    writer: ChromaWriter,
+    workers: int = 1,
+):
+    total_files = len(all_files)
+    total_batches = (total_files + batch_size - 1) // batch_size
+    extracted = iter_extracted_documents(all_files, workers)
+    for batch_number in range(1, total_batches + 1):
+        logging.info(f"--- Processing Batch {batch_number}/{total_batches} ---")
+        parse_start = time.perf_counter()
+        batch_file_chunks = [
+            (file_path, document_chunks)
+            for file_path, document_chunks in itertools.islice(extracted, batch_size)
+            if document_chunks is not None
+        ]
+        parse_seconds = time.perf_counter() - parse_start
+        texts = [
+            doc.page_content
+            for _, document_chunks in batch_file_chunks
+            for doc in document_chunks
+        ]
+        if not texts:
             logging.warning(
                 "No documents were processed in this batch. Moving to the next."
             )
+            writer.write(batch_file_chunks, [])
             continue
         logging.info(
-            f"Generating embeddings for {len(batch_document_chunks)} text chunks in this batch."
+            f"Generating embeddings for {len(texts)} text chunks in this batch."
         )
         try:
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001", google_api_key=api_key
+            embed_start = time.perf_counter()
+            vectors, failed = embedder.embed_with_failures(texts)
+            batch_file_chunks, vectors = drop_failed_files(
+                batch_file_chunks, vectors, failed
             )
-            vector_store = Chroma.from_documents(
-                documents=batch_document_chunks,
-                embedding=embeddings,
-                collection_name="ultima-collection",
-                persist_directory="chromadata",
+            write_start = time.perf_counter()
+            writer.write(batch_file_chunks, vectors)
+            INGEST_STAGE_SECONDS.labels("parse_wait").observe(parse_seconds)
+            INGEST_STAGE_SECONDS.labels("embed").observe(write_start - embed_start)
+            INGEST_STAGE_SECONDS.labels("write").observe(
+                time.perf_counter() - write_start
+            )
+            logging.info(
+                f"Embeddings complete for this batch, Chroma DB updated "
+                f"(parse wait {parse_seconds:.2f}s, "
+                f"embed {write_start - embed_start:.2f}s, "
+                f"write {time.perf_counter() - write_start:.2f}s)."
             )
-            vector_store.persist()
-            logging.info("Embeddings complete for this batch, Chroma DB updated.")
         except Exception as e:
             logging.exception(f"Failed to generate embeddings for this batch: {e}")
 
 
+_PIPELINE_DONE = object()
+
+
+def process_files_pipelined(
+    all_files: list[str],
+    embedder: EmbeddingScheduler,
+    writer: ChromaWriter,
+    workers: int = 1,
+    embed_batch_size: int | None = None,
+    queue_size: int = 8,
+):
+    """Streams files through parse -> embed -> write stages over bounded queues."""
+    embed_batch_size = embed_batch_size or embedder.batch_size * embedder.concurrency
+    parsed_queue = queue.Queue(maxsize=queue_size)
+    embedded_queue = queue.Queue(maxsize=queue_size)
+
+    def parse_stage():
+        try:
+            for file_path, document_chunks in iter_extracted_documents(
+                all_files, workers
+            ):
+                if document_chunks is not None:
+                    parsed_queue.put((file_path, document_chunks))
+        except Exception as e:
+            logging.exception(f"Parse stage stopped early: {e}")
+        finally:
+            parsed_queue.put(_PIPELINE_DONE)
+
+    def write_stage():
+        while (item := embedded_queue.get()) is not _PIPELINE_DONE:
+            group, vectors = item
+            write_start = time.perf_counter()
+            try:
+                writer.write(group, vectors)
+                INGEST_STAGE_SECONDS.labels("write").observe(
+                    time.perf_counter() - write_start
+                )
+                logging.info(
+                    f"Wrote {len(vectors)} chunks from {len(group)} files in "
+                    f"{time.perf_counter() - write_start:.2f}s "
+                    f"({writer.files_written}/{len(all_files)} files done)."
+                )
+            except Exception as e:
+                logging.exception(
+                    f"Failed to write {len(vectors)} chunks to Chroma: {e}"
+                )
+
+    parser = threading.Thread(target=parse_stage, name="ingest-parse", daemon=True)
+    write_thread = threading.Thread(
+        target=write_stage, name="ingest-write", daemon=True
+    )
+    parser.start()
+    write_thread.start()
+    parse_done = False
+    try:
+        while not parse_done:
+            wait_start = time.perf_counter()
+            item = parsed_queue.get()
+            INGEST_STAGE_SECONDS.labels("parse_wait").observe(
+                time.perf_counter() - wait_start
+            )
+            if item is _PIPELINE_DONE:
+                break
+            group = [item]
+            chunk_count = len(item[1])
+            while chunk_count < embed_batch_size:
+                try:
+                    item = parsed_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _PIPELINE_DONE:
+                    parse_done = True
+                    break
+                group.append(item)
+                chunk_count += len(item[1])
+            texts = [doc.page_content for _, docs in group for doc in docs]
+            try:
+                embed_start = time.perf_counter()
+                vectors, failed = embedder.embed_with_failures(texts)
+                INGEST_STAGE_SECONDS.labels("embed").observe(
+                    time.perf_counter() - embed_start
+                )
+                group, vectors = drop_failed_files(group, vectors, failed)
+            except Exception as e:
+                logging.exception(
+                    f"Failed to generate embeddings for {len(group)} files: {e}"
+                )
+                continue
+            embedded_queue.put((group, vectors))
+    except Exception as e:
+        logging.exception(f"Embedding stage stopped early: {e}")
+        if not parse_done:
+            while parsed_queue.get() is not _PIPELINE_DONE:
+                pass
+    finally:
+        embedded_queue.put(_PIPELINE_DONE)
+        parser.join()
+        write_thread.join()
+
+
 def main():
     logging.info("Ingestion script activated...")
     api_key = os.environ.get("GOOGLE_API_KEY")
@@ -283,6 +710,7 @@ def main():
         f"Searching for documents in '{root_folder_path}' and all subfolders..."
     )
     all_files = []
+    root_folder_path = os.path.abspath(root_folder_path)
     supported_extensions = (".pdf", ".docx", ".txt", ".eml", ".msg")
     for root, _, files in os.walk(root_folder_path):
         for file in files:
@@ -294,9 +722,81 @@ def main():
         )
         return
     logging.info(f"Found {len(all_files)} total files to process.")
+    manifest = load_manifest()
+    files_to_process, fingerprints, deleted = plan_incremental_ingest(
+        all_files, manifest
+    )
+    logging.info(
+        f"{len(files_to_process)} new or changed, "
+        f"{len(all_files) - len(files_to_process)} unchanged, "
+        f"{len(deleted)} deleted since the last run."
+    )
+    setup_start = time.perf_counter()
+    embedder = EmbeddingScheduler.from_env(api_key, cache=get_embedding_cache())
+    writer = ChromaWriter(
+        manifest,
+        fingerprints,
+        flush_every=int(os.environ.get("INGEST_FLUSH_EVERY", "10")),
+    )
+    logging.info(
+        f"Opened the embeddings client and Chroma collection in "
+        f"{time.perf_counter() - setup_start:.2f}s."
+    )
+    if deleted:
+        writer.delete_files(deleted)
+    writer.flush()
     batch_size = 20
-    process_files_in_batches(all_files, batch_size, api_key)
-    logging.info("Ingestion completed!")
+    workers = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+    logging.info(f"Parsing documents with {workers} worker processes.")
+    ingest_start = time.perf_counter()
+    try:
+        if os.environ.get("INGEST_MODE", "batch") == "pipeline":
+            process_files_pipelined(files_to_process, embedder, writer, workers)
+        else:
+            process_files_in_batches(
+                files_to_process, batch_size, embedder, writer, workers
+            )
+    finally:
+        writer.flush()
+        embedder.close()
+    # Chunks from ingests before the manifest keep serving searches until
+    # every file has been re-ingested under manifest-tracked IDs
+    managed_chunks = sum(len(entry.get("chunk_ids", [])) for entry in manifest.values())
+    removed = 0
+    if writer.collection.count() > managed_chunks:
+        missing = sum(1 for file_path in all_files if file_path not in manifest)
+        if missing:
+            logging.warning(
+                f"Keeping chunks from ingests before the manifest until the "
+                f"{missing} files that failed this run are ingested."
+            )
+        else:
+            removed = writer.delete_unmanaged_chunks()
+            logging.info(f"Removed {removed} chunks from ingests before the manifest.")
+    # With nothing added or removed the collection is as the last run left it
+    changed = bool(files_to_process or deleted or removed)
+    index_start = time.perf_counter()
+    if changed or not os.path.exists(os.path.join(BM25_INDEX_DIR, VOCAB_FILE)):
+        build_bm25_index(writer.collection)
+    else:
+        logging.info("Collection unchanged, keeping the BM25 index.")
+    if os.environ.get("RAG_INDEX_BACKEND", "chroma") == "numpy":
+        if changed or not os.path.exists(os.path.join(NUMPY_INDEX_DIR, VECTORS_FILE)):
+            build_numpy_index(writer.collection)
+        else:
+            logging.info("Collection unchanged, keeping the NumPy index.")
+    INGEST_STAGE_SECONDS.labels("index").observe(time.perf_counter() - index_start)
+    logging.info(
+        f"Embedding requests sent: {embedder.requests_sent}, "
+        f"retried: {embedder.retries}; embedding cache {embedder.cache.stats()}."
+    )
+    logging.info(
+        f"Ingestion completed! {writer.files_written} files written in "
+        f"{time.perf_counter() - ingest_start:.2f}s."
+    )
+    metrics_path = os.environ.get("INGEST_METRICS_TEXTFILE")
+    if metrics_path:
+        write_ingest_textfile(metrics_path)
 
 
 if __name__ == "__main__":
@@ -84,6 +84,5 @@ def minerva() -> rx.Component:
         rx.el.div(
             rx.cond(ChatState.tos_accepted, chat_interface(), terms_of_service()),
             class_name="flex flex-col items-center justify-center w-full",
-            on_mount=ChatState.minerva_page_load,
         )
     )
\ No newline at end of file
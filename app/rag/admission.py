@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request would wait longer than the queue budget."""
+
+
+class AdmissionController:
+    """Caps concurrent Gemini generations per worker behind a FIFO queue.
+
+    At most `max_inflight` requests hold a slot; the rest wait in arrival
+    order and a freed slot is handed straight to the head of the queue.
+    A request is shed up front when its estimated wait (queue position times
+    the average generation time, spread over the slots) exceeds
+    `queue_budget`, and shed after queueing if it actually waits that long.
+    Waiters are told their position through `on_position` whenever it
+    changes.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 8,
+        queue_budget: float = 30.0,
+        poll_interval: float = 0.5,
+    ):
+        self.max_inflight = max(1, max_inflight)
+        self.queue_budget = queue_budget
+        self.poll_interval = poll_interval
+        self.inflight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._average_service_time = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_inflight=int(os.environ.get("LLM_MAX_INFLIGHT", "8")),
+            queue_budget=float(os.environ.get("LLM_QUEUE_BUDGET", "30")),
+        )
+
+    def estimated_wait(self, position: int) -> float:
+        return position * self._average_service_time / self.max_inflight
+
+    async def acquire(
+        self, on_position: Callable[[int], Awaitable[None]] | None = None
+    ):
+        if self.inflight < self.max_inflight and not self._waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return
+        position = len(self._waiters) + 1
+        if self.estimated_wait(position) > self.queue_budget:
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"Estimated wait {self.estimated_wait(position):.0f}s at position "
+                f"{position} exceeds the {self.queue_budget:.0f}s budget."
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        deadline = time.monotonic() + self.queue_budget
+        reported = None
+        try:
+            while not waiter.done():
+                position = self._waiters.index(waiter) + 1
+                if on_position is not None and position != reported:
+                    reported = position
+                    await on_position(position)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.wait([waiter], timeout=min(self.poll_interval, remaining))
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+        if waiter.cancelled():
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"Waited {self.queue_budget:.0f}s without a free generation slot."
+            )
+        self.admitted += 1
+
+    def release(self, service_time: float | None = None):
+        if service_time is not None:
+            self._average_service_time = (
+                service_time
+                if not self._average_service_time
+                else 0.8 * self._average_service_time + 0.2 * service_time
+            )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter, so inflight stays unchanged.
+                waiter.set_result(None)
+                return
+        self.inflight -= 1
+
+    @asynccontextmanager
+    async def admit(self, on_position: Callable[[int], Awaitable[None]] | None = None):
+        await self.acquire(on_position)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+            logging.debug(
+                f"Generation slots: {self.inflight}/{self.max_inflight} in use, "
+                f"{len(self._waiters)} queued."
+            )
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller configured from LLM_MAX_INFLIGHT/_QUEUE_BUDGET."""
+    return AdmissionController.from_env()
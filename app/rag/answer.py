@@ -0,0 +1,65 @@
+import time
+import logging
+from contextlib import aclosing
+from typing import Awaitable, Callable
+from app.rag.admission import get_admission_controller
+from app.rag.context import build_context
+from app.rag.context_cache import get_context_cache
+from app.rag.engine import RagEngine
+from app.rag.streaming import DeltaCoalescer
+
+
+async def answer_question(
+    engine: RagEngine,
+    question: str,
+    on_delta: Callable[[str], Awaitable[None]],
+    on_position: Callable[[int], Awaitable[None]] | None = None,
+) -> str:
+    """Runs one question through retrieval and generation and returns the answer.
+
+    Streamed text is passed to `on_delta` in coalesced pieces (the final
+    piece only reaches the returned answer). While the question waits for a
+    generation slot `on_position` gets its place in line, then 0 once it is
+    admitted. Kept free of UI state so ChatState and the benchmarks share
+    one code path; errors propagate to the caller, including ones raised
+    by the callbacks, which stop generation.
+    """
+    question_embedding = await engine.aembed_query(question)
+    relevant_docs = await engine.asearch(question, question_embedding)
+    context_start = time.perf_counter()
+    context, context_docs = build_context(relevant_docs, engine.context_tokens)
+    engine.record_stage("context", time.perf_counter() - context_start)
+    passages = [doc.page_content for doc in context_docs]
+    cached_answer = engine.answer_cache.get(question, passages, question_embedding)
+    if cached_answer is not None:
+        return cached_answer
+    logging.info(
+        f"Using {len(context_docs)} of {len(relevant_docs)} retrieved passages."
+    )
+    queued = False
+
+    async def report_position(position: int):
+        nonlocal queued
+        queued = True
+        if on_position is not None:
+            await on_position(position)
+
+    answer = ""
+    queue_start = time.perf_counter()
+    async with get_admission_controller().admit(report_position):
+        engine.record_stage("queue", time.perf_counter() - queue_start)
+        if queued and on_position is not None:
+            await on_position(0)
+        coalescer = DeltaCoalescer.from_env()
+        # aclosing ends the provider stream at once if on_delta raises
+        async with aclosing(get_context_cache().stream(context, question)) as stream:
+            async for text in stream:
+                coalescer.add(text)
+                if coalescer.should_flush():
+                    delta = coalescer.take()
+                    answer += delta
+                    await on_delta(delta)
+        answer += coalescer.take()
+    if answer:
+        engine.answer_cache.put(question, passages, answer, question_embedding)
+    return answer
@@ -0,0 +1,117 @@
+import os
+import re
+import math
+import hashlib
+import time
+import threading
+from dataclasses import dataclass
+from collections import OrderedDict
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.! ").lower()
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def passages_key(passages: list[str]) -> str:
+    """Digest of the context passages' text, in order."""
+    digest = hashlib.sha256()
+    for passage in passages:
+        digest.update(hashlib.sha256(passage.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+@dataclass
+class _CachedAnswer:
+    answer: str
+    embedding: list[float] | None
+    expires_at: float
+
+
+class AnswerCache:
+    """Finished answers for repeated questions, shared by every session.
+
+    Entries are keyed on the normalized question plus a digest of the text
+    of the passages the answer was generated from. Chunk and parent IDs
+    survive a re-ingest of a changed file, but the text does not, so an
+    answer over outdated passages is never served. When the exact question
+    misses, an entry built from the same passages whose question embedding
+    has cosine similarity of at least `similarity_threshold` is accepted
+    instead (0 disables that). Entries expire after `ttl_seconds` and the
+    least recently used are evicted past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], _CachedAnswer] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        return cls(
+            max_entries=int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.environ.get("ANSWER_CACHE_TTL", "3600")),
+            similarity_threshold=float(
+                os.environ.get("ANSWER_CACHE_SIMILARITY", "0.95")
+            ),
+        )
+
+    def get(
+        self,
+        question: str,
+        passages: list[str],
+        embedding: list[float] | None = None,
+    ) -> str | None:
+        context_key = passages_key(passages)
+        key = (normalize_question(question), context_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and embedding and self.similarity_threshold:
+                for (_, other_context), candidate in reversed(self._entries.items()):
+                    if (
+                        other_context == context_key
+                        and candidate.embedding
+                        and candidate.expires_at > now
+                        and _cosine(embedding, candidate.embedding)
+                        >= self.similarity_threshold
+                    ):
+                        entry = candidate
+                        break
+            if entry is None or entry.expires_at <= now:
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.answer
+
+    def put(
+        self,
+        question: str,
+        passages: list[str],
+        answer: str,
+        embedding: list[float] | None = None,
+    ):
+        key = (normalize_question(question), passages_key(passages))
+        with self._lock:
+            self._entries[key] = _CachedAnswer(
+                answer, embedding, time.monotonic() + self.ttl_seconds
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
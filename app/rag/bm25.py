@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter, defaultdict
+import numpy as np
+from langchain_core.documents import Document
+from app.rag.chunk_store import ChunkStore, iter_collection, write_chunk_store
+from app.rag.config import BM25_INDEX_DIR
+
+VOCAB_FILE = "vocab.json"
+DOC_IDS_FILE = "postings_docs.npy"
+TERM_FREQS_FILE = "postings_tfs.npy"
+DOC_LENGTHS_FILE = "doc_lengths.npy"
+
+# Statute and rule citations such as "78B-6-802" or "§ 57-22-4.5" stay whole
+# so an exact citation in the question matches the same token in the text.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.:][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it "
+    "its my of on or that the their there this to was what when where which who "
+    "why will with without you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS
+    ]
+
+
+def build_bm25_index(collection, directory: str = BM25_INDEX_DIR):
+    """Builds the on-disk inverted index over every chunk in a Chroma collection.
+
+    Postings are stored term-major as two flat arrays (chunk row, term
+    frequency) with a vocabulary mapping each term to its slice, next to a
+    ChunkStore holding the chunk text in the same row order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+    doc_lengths = []
+
+    def rows():
+        for page in iter_collection(collection):
+            for chunk_id, text, metadata in zip(
+                page["ids"], page["documents"], page["metadatas"]
+            ):
+                term_counts = Counter(tokenize(text))
+                for term, count in term_counts.items():
+                    postings[term].append((len(doc_lengths), count))
+                doc_lengths.append(sum(term_counts.values()))
+                yield (chunk_id, text, metadata)
+
+    write_chunk_store(directory, rows())
+    vocab = {}
+    doc_ids = []
+    term_freqs = []
+    for term in sorted(postings):
+        vocab[term] = [len(doc_ids), len(postings[term])]
+        for row, count in postings[term]:
+            doc_ids.append(row)
+            term_freqs.append(min(count, 65535))
+    arrays = {
+        DOC_IDS_FILE: np.asarray(doc_ids, dtype=np.int32),
+        TERM_FREQS_FILE: np.asarray(term_freqs, dtype=np.uint16),
+        DOC_LENGTHS_FILE: np.asarray(doc_lengths, dtype=np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.tmp.npy"), array)
+        os.replace(
+            os.path.join(directory, f"{name}.tmp.npy"), os.path.join(directory, name)
+        )
+    with open(os.path.join(directory, f"{VOCAB_FILE}.tmp"), "w") as vocab_file:
+        json.dump(vocab, vocab_file)
+    os.replace(
+        os.path.join(directory, f"{VOCAB_FILE}.tmp"),
+        os.path.join(directory, VOCAB_FILE),
+    )
+    logging.info(
+        f"Built BM25 index over {len(doc_lengths)} chunks and {len(vocab)} terms."
+    )
+
+
+class BM25Index:
+    """Okapi BM25 search over the memory-mapped index from build_bm25_index."""
+
+    def __init__(
+        self, directory: str = BM25_INDEX_DIR, k1: float = 1.2, b: float = 0.75
+    ):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.stamp = index_stamp(directory)
+        with open(os.path.join(directory, VOCAB_FILE)) as vocab_file:
+            self.vocab: dict[str, list[int]] = json.load(vocab_file)
+        self.doc_ids = np.load(os.path.join(directory, DOC_IDS_FILE), mmap_mode="r")
+        self.term_freqs = np.load(
+            os.path.join(directory, TERM_FREQS_FILE), mmap_mode="r"
+        )
+        self.doc_lengths = np.load(os.path.join(directory, DOC_LENGTHS_FILE))
+        self.average_length = float(self.doc_lengths.mean()) if len(self) else 0.0
+        self.chunks = ChunkStore(directory)
+
+    def search(self, question: str, k: int) -> list[Document]:
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(question)):
+            if term not in self.vocab:
+                continue
+            start, doc_freq = self.vocab[term]
+            rows = self.doc_ids[start : start + doc_freq]
+            tfs = self.term_freqs[start : start + doc_freq].astype(np.float32)
+            idf = math.log(1 + (len(self) - doc_freq + 0.5) / (doc_freq + 0.5))
+            norm = self.k1 * (
+                1 - self.b + self.b * self.doc_lengths[rows] / self.average_length
+            )
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [self.chunks.document(int(row)) for row in top]
+
+    def is_stale(self) -> bool:
+        """Whether build_bm25_index has replaced the files since they were opened."""
+        return index_stamp(self.directory) != self.stamp
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+
+def index_stamp(directory: str = BM25_INDEX_DIR) -> int | None:
+    # The vocabulary is swapped in last, once every other file is in place
+    try:
+        return os.stat(os.path.join(directory, VOCAB_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def open_bm25_index() -> BM25Index | None:
+    if not os.path.exists(os.path.join(BM25_INDEX_DIR, VOCAB_FILE)):
+        logging.warning("No BM25 index found; retrieval will be vector-only.")
+        return None
+    return BM25Index()
@@ -0,0 +1,61 @@
+import os
+import json
+import mmap
+from typing import Iterable
+import numpy as np
+from langchain_core.documents import Document
+
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "offsets.npy"
+
+
+def write_chunk_store(directory: str, chunks: Iterable[tuple[str, str, dict]]) -> int:
+    """Writes (chunk_id, text, metadata) rows as a JSON-lines file plus offsets.
+
+    Files are written under temporary names and swapped in, so processes
+    that already mapped the old store keep reading it until they reload.
+    """
+    os.makedirs(directory, exist_ok=True)
+    offsets = [0]
+    chunks_path = os.path.join(directory, f"{CHUNKS_FILE}.tmp")
+    with open(chunks_path, "wb") as chunks_file:
+        for chunk_id, text, metadata in chunks:
+            line = json.dumps(
+                {"text": text, "metadata": {**(metadata or {}), "chunk_id": chunk_id}}
+            ).encode("utf-8")
+            chunks_file.write(line + b"\n")
+            offsets.append(offsets[-1] + len(line) + 1)
+    offsets_path = os.path.join(directory, f"{OFFSETS_FILE}.tmp.npy")
+    np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+    os.replace(offsets_path, os.path.join(directory, OFFSETS_FILE))
+    os.replace(chunks_path, os.path.join(directory, CHUNKS_FILE))
+    return len(offsets) - 1
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a store written by write_chunk_store."""
+
+    def __init__(self, directory: str):
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(directory, CHUNKS_FILE), "rb") as chunks_file:
+            self._chunks = (
+                mmap.mmap(chunks_file.fileno(), 0, access=mmap.ACCESS_READ)
+                if os.fstat(chunks_file.fileno()).st_size
+                else b""
+            )
+
+    def document(self, row: int) -> Document:
+        chunk = json.loads(self._chunks[self.offsets[row] : self.offsets[row + 1]])
+        return Document(page_content=chunk["text"], metadata=chunk["metadata"])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def iter_collection(collection, include_embeddings: bool = False, page_size=1000):
+    """Pages through a Chroma collection, yielding one dict per page."""
+    include = ["documents", "metadatas"]
+    if include_embeddings:
+        include.append("embeddings")
+    for start in range(0, collection.count(), page_size):
+        yield collection.get(include=include, limit=page_size, offset=start)
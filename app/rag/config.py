@@ -0,0 +1,6 @@
+CHROMA_DIR = "chromadata"
+COLLECTION_NAME = "ultima-collection"
+EMBEDDING_MODEL = "models/embedding-001"
+NUMPY_INDEX_DIR = "vectorindex"
+BM25_INDEX_DIR = "bm25index"
+PARENT_STORE_PATH = "chromadata/parents.sqlite3"
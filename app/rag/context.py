@@ -0,0 +1,58 @@
+import os
+import re
+from langchain_core.documents import Document
+from app.rag.embedding_scheduler import estimate_tokens
+
+WORD_PATTERN = re.compile(r"\w+")
+SHINGLE_SIZE = 5
+
+
+def shingles(text: str) -> set[tuple[str, ...]]:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {
+        tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def build_context(
+    docs: list[Document],
+    token_budget: int | None = None,
+    duplicate_threshold: float = 0.5,
+) -> tuple[str, list[Document]]:
+    """Packs ranked passages into a prompt context of at most `token_budget`.
+
+    Passages are taken in rank order. One whose 5-word shingles are mostly
+    contained in an already selected passage (typically the overlap between
+    neighbouring chunks) is skipped, as is one that no longer fits. The top
+    passage is truncated rather than dropped if it alone exceeds the budget.
+    Returns the context text and the passages it was built from.
+    """
+    if token_budget is None:
+        token_budget = int(os.environ.get("RAG_CONTEXT_TOKENS", "4000"))
+    selected: list[Document] = []
+    passages: list[str] = []
+    seen: list[set[tuple[str, ...]]] = []
+    used_tokens = 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text:
+            continue
+        doc_shingles = shingles(text)
+        if any(
+            len(doc_shingles & other) >= duplicate_threshold * len(doc_shingles)
+            for other in seen
+        ):
+            continue
+        tokens = estimate_tokens(text)
+        if used_tokens + tokens > token_budget:
+            if selected:
+                continue
+            text = text[: token_budget * 4]
+            tokens = estimate_tokens(text)
+        selected.append(doc)
+        passages.append(text)
+        seen.append(doc_shingles)
+        used_tokens += tokens
+    return ("\n\n".join(passages), selected)
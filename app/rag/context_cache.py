@@ -0,0 +1,200 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, Protocol
+from app.rag.embedding_scheduler import estimate_tokens
+from app.rag.llm_client import (
+    GenerationClient,
+    GenerationError,
+    build_prompt,
+    build_question_block,
+    get_generation_client,
+)
+from app.rag.metrics import register_cache
+
+
+class CachedContentStore(Protocol):
+    async def create_cached_content(self, context: str, ttl_seconds: int) -> str: ...
+
+    async def delete_cached_content(self, name: str): ...
+
+
+class LocalCachedContents:
+    """Stand-in for Gemini's cachedContents API for tests and local stubs.
+
+    Entries live in a dict, and ContextCache keeps sending the full prompt
+    inline, so answers are unchanged while the create/hit/evict bookkeeping
+    runs exactly as it would against the provider.
+    """
+
+    inline = True
+
+    def __init__(self):
+        self.contents: dict[str, str] = {}
+        self._next_id = 0
+
+    async def create_cached_content(self, context: str, ttl_seconds: int) -> str:
+        self._next_id += 1
+        name = f"cachedContents/local-{self._next_id}"
+        self.contents[name] = context
+        return name
+
+    async def delete_cached_content(self, name: str):
+        self.contents.pop(name, None)
+
+
+def context_key(context: str) -> str:
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _CacheEntry:
+    name: str
+    tokens: int
+    expires_at: float
+
+
+class ContextCache:
+    """Provider-side caching of the system instruction plus a context.
+
+    Gemini caches only a prefix of at least `min_tokens`, which the short
+    instruction block never reaches on its own, so entries cover the
+    instruction together with one assembled context. Entries are keyed on a
+    digest of the context text, never on chunk IDs, which outlive a change
+    to the file they came from. A context becomes cached once it has been
+    seen `min_uses` times; creation happens in the background, and later
+    questions over the same context send only the question with a
+    reference to the cache entry. At most `max_entries`
+    are kept, the least recently used being deleted first.
+    """
+
+    def __init__(
+        self,
+        client: GenerationClient,
+        store: CachedContentStore | None = None,
+        min_tokens: int = 1024,
+        min_uses: int = 2,
+        ttl_seconds: int = 3600,
+        max_entries: int = 32,
+    ):
+        self.client = client
+        self.store = store
+        self.min_tokens = min_tokens
+        self.min_uses = min_uses
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._instruction_tokens = estimate_tokens(client.system_instruction)
+        self._uses: OrderedDict[str, int] = OrderedDict()
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._creating: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls, client: GenerationClient) -> "ContextCache":
+        mode = os.environ.get("GEMINI_CONTEXT_CACHE", "off").lower()
+        store = {"remote": client, "local": LocalCachedContents()}.get(mode)
+        return cls(
+            client,
+            store,
+            min_tokens=int(os.environ.get("GEMINI_CACHE_MIN_TOKENS", "1024")),
+            min_uses=int(os.environ.get("GEMINI_CACHE_MIN_USES", "2")),
+            ttl_seconds=int(os.environ.get("GEMINI_CACHE_TTL", "3600")),
+            max_entries=int(os.environ.get("GEMINI_CACHE_MAX_ENTRIES", "32")),
+        )
+
+    def prepare(self, context: str, question: str) -> tuple[str, str | None, int]:
+        """Returns the prompt, the cache entry it relies on and the tokens saved."""
+        if self.store is None:
+            return (build_prompt(context, question), None, 0)
+        key = context_key(context)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic() + 30:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.tokens_saved += entry.tokens
+            if getattr(self.store, "inline", False):
+                return (build_prompt(context, question), None, entry.tokens)
+            return (build_question_block(question), entry.name, entry.tokens)
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        uses = self._uses.pop(key, 0) + 1
+        self._uses[key] = uses
+        while len(self._uses) > self.max_entries * 32:
+            self._uses.popitem(last=False)
+        tokens = self._instruction_tokens + estimate_tokens(context)
+        if (
+            uses >= self.min_uses
+            and tokens >= self.min_tokens
+            and key not in self._creating
+        ):
+            self._creating.add(key)
+            task = asyncio.get_running_loop().create_task(
+                self._create(key, context, tokens)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return (build_prompt(context, question), None, 0)
+
+    async def _create(self, key: str, context: str, tokens: int):
+        try:
+            name = await self.store.create_cached_content(context, self.ttl_seconds)
+            self._entries[key] = _CacheEntry(
+                name, tokens, time.monotonic() + self.ttl_seconds
+            )
+            logging.info(f"Cached {tokens} context tokens as {name}.")
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                await self.store.delete_cached_content(evicted.name)
+        except Exception as e:
+            logging.exception(f"Could not create cached content: {e}")
+        finally:
+            self._creating.discard(key)
+
+    async def stream(self, context: str, question: str) -> AsyncIterator[str]:
+        """Streams an answer, using a cache entry for the context when one exists.
+
+        If the provider rejects the entry (it expired or was deleted) before
+        any text arrives, the entry is dropped and the full prompt is sent.
+        """
+        prompt, cached_content, cached_tokens = self.prepare(context, question)
+        input_tokens = estimate_tokens(prompt)
+        if cached_content is None:
+            input_tokens += self._instruction_tokens
+        logging.info(
+            f"Sending ~{input_tokens} input tokens "
+            f"({cached_tokens} covered by the context cache)."
+        )
+        started = False
+        try:
+            async with aclosing(self.client.stream(prompt, cached_content)) as stream:
+                async for text in stream:
+                    started = True
+                    yield text
+        except GenerationError as e:
+            if cached_content is None or started or e.status not in (400, 403, 404):
+                raise
+            logging.warning(f"Cached content {cached_content} rejected: {e}")
+            self._entries.pop(context_key(context), None)
+            async with aclosing(
+                self.client.stream(build_prompt(context, question))
+            ) as stream:
+                async for text in stream:
+                    yield text
+
+
+@lru_cache(maxsize=None)
+def get_context_cache() -> ContextCache:
+    """Process-wide cache selected by GEMINI_CONTEXT_CACHE (off, remote or local)."""
+    context_cache = ContextCache.from_env(get_generation_client())
+    register_cache("context", context_cache)
+    return context_cache
@@ -0,0 +1,113 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from array import array
+from functools import lru_cache
+from app.rag.sqlite_store import open_sqlite
+
+DEFAULT_CACHE_PATH = os.path.join("chromadata", "embedding_cache.sqlite3")
+_QUERY_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite store of float32 embeddings keyed by (model, sha256 of text).
+
+    Entries carry a last-used timestamp; once the table grows past
+    `max_entries` the least recently used tenth is evicted. Safe to share
+    between threads, and WAL mode lets several processes read it at once.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "last_used REAL NOT NULL, PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._estimated_entries = self._count()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _QUERY_CHUNK):
+                chunk = hashes[start : start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? "
+                    "WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return [array("f", found[h]).tolist() if h in found else None for h in hashes]
+
+    def put_many(self, model: str, texts: list[str], vectors: list[list[float]]):
+        now = time.time()
+        rows = [
+            (model, text_hash(text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+            self._estimated_entries += len(rows)
+            if self._estimated_entries > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        count = self._count()
+        if count > self.max_entries:
+            excess = count - self.max_entries + self.max_entries // 10
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN ("
+                "SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            logging.info(f"Evicted {excess} least recently used cached embeddings.")
+            count -= excess
+        self._estimated_entries = count
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": self._estimated_entries,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache configured from EMBEDDING_CACHE_PATH/_MAX_ENTRIES."""
+    return EmbeddingCache(
+        os.environ.get("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH),
+        int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "100000")),
+    )
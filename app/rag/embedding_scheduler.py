@@ -0,0 +1,400 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+import aiohttp
+from langchain_core.embeddings import Embeddings
+from app.rag.embedding_cache import EmbeddingCache
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# Bad key, no permission or unknown model: every other batch would fail too
+FATAL_STATUSES = {401, 403, 404}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class EmbeddingFailure(Exception):
+    """Raised by embed_documents when some texts could not be embedded.
+
+    `status` and `message` describe the last request given up on; status is
+    None when it never got a response.
+    """
+
+    def __init__(self, failed: list[int], status: int | None = None, message: str = ""):
+        detail = f" Last status {status}: {message}" if status else ""
+        super().__init__(f"{len(failed)} texts could not be embedded.{detail}")
+        self.failed = failed
+        self.status = status
+        self.message = message
+
+
+class RateLimiter:
+    """Sliding one-minute window over request and token budgets."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._window: deque[tuple[float, int]] = deque()
+        self._window_tokens = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._window and now - self._window[0][0] >= 60:
+                    self._window_tokens -= self._window.popleft()[1]
+                over_requests = (
+                    self.requests_per_minute
+                    and len(self._window) >= self.requests_per_minute
+                )
+                over_tokens = (
+                    self.tokens_per_minute
+                    and self._window
+                    and self._window_tokens + tokens > self.tokens_per_minute
+                )
+                if not over_requests and not over_tokens:
+                    break
+                await asyncio.sleep(60 - (now - self._window[0][0]))
+            self._window.append((time.monotonic(), tokens))
+            self._window_tokens += tokens
+
+
+class EmbeddingScheduler(Embeddings):
+    """Embeds texts through the Gemini batchEmbedContents REST endpoint.
+
+    Texts are packed into API batches of up to `batch_size` items and
+    `max_batch_tokens` estimated tokens, and up to `concurrency` requests are
+    kept in flight. A 429 or 5xx retries the batch with jittered exponential
+    backoff (honouring Retry-After) and pauses every worker. A 400 splits
+    the batch in half so one bad text cannot sink its neighbours; a 401, 403
+    or 404 fails the batch and every batch still queued, since they would
+    all get the same answer. Other statuses fail just the batch. `base_url`
+    can point at a local fake server such as benchmarks.stubs for testing. With a `cache`,
+    only texts it has never embedded before reach the API.
+
+    The scheduler runs its own event loop on a daemon thread so synchronous
+    ingest code can share one pooled HTTP session across every call.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "models/embedding-001",
+        base_url: str | None = None,
+        batch_size: int = 100,
+        max_batch_tokens: int = 20000,
+        concurrency: int = 4,
+        requests_per_minute: int = 1500,
+        tokens_per_minute: int = 0,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        task_type: str = "RETRIEVAL_DOCUMENT",
+        cache: EmbeddingCache | None = None,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = (
+            base_url or os.environ.get("GOOGLE_API_BASE_URL", DEFAULT_BASE_URL)
+        ).rstrip("/")
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.task_type = task_type
+        self.cache = cache
+        self.requests_sent = 0
+        self.retries = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+        self._session: aiohttp.ClientSession | None = None
+        self._limiter: RateLimiter | None = None
+        self._cooldown_until = 0.0
+
+    @classmethod
+    def from_env(cls, api_key: str, **kwargs) -> "EmbeddingScheduler":
+        return cls(
+            api_key,
+            batch_size=int(os.environ.get("EMBED_BATCH_SIZE", "100")),
+            concurrency=int(os.environ.get("EMBED_CONCURRENCY", "4")),
+            requests_per_minute=int(os.environ.get("EMBED_RPM", "1500")),
+            tokens_per_minute=int(os.environ.get("EMBED_TPM", "0")),
+            **kwargs,
+        )
+
+    def _pack(self, indices: list[int], texts: list[str]) -> list[list[int]]:
+        batches = []
+        current = []
+        current_tokens = 0
+        for i in indices:
+            tokens = estimate_tokens(texts[i])
+            if current and (
+                len(current) == self.batch_size
+                or current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def _post(
+        self, texts: list[str], task_type: str
+    ) -> tuple[int, dict, float | None]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=120),
+            )
+        body = {
+            "requests": [
+                {
+                    "model": self.model,
+                    "content": {"parts": [{"text": text}]},
+                    "taskType": task_type,
+                }
+                for text in texts
+            ]
+        }
+        async with self._session.post(
+            f"{self.base_url}/v1beta/{self.model}:batchEmbedContents",
+            json=body,
+            headers={"x-goog-api-key": self.api_key},
+        ) as response:
+            retry_after = response.headers.get("Retry-After")
+            payload = await response.json(content_type=None)
+            return (
+                response.status,
+                payload or {},
+                float(retry_after) if retry_after else None,
+            )
+
+    async def _run_batch(
+        self,
+        indices: list[int],
+        attempt: int,
+        texts: list[str],
+        vectors: list[list[float] | None],
+        work: asyncio.Queue,
+        failed: list[int],
+        task_type: str,
+        last_error: dict,
+    ):
+        batch_texts = [texts[i] for i in indices]
+        await self._limiter.acquire(sum(estimate_tokens(t) for t in batch_texts))
+        cooldown = self._cooldown_until - time.monotonic()
+        if cooldown > 0:
+            await asyncio.sleep(cooldown)
+        self.requests_sent += 1
+        try:
+            status, payload, retry_after = await self._post(batch_texts, task_type)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logging.warning(f"Embedding request failed: {e}")
+            status, payload, retry_after = (None, {}, None)
+        embeddings = payload.get("embeddings", []) if status == 200 else []
+        if status == 200 and len(embeddings) == len(indices):
+            for i, embedding in zip(indices, embeddings):
+                vectors[i] = embedding["values"]
+            return
+        if status is None or status in RETRYABLE_STATUSES:
+            if attempt < self.max_retries:
+                delay = retry_after or self._backoff(attempt)
+                if status == 429:
+                    self._cooldown_until = max(
+                        self._cooldown_until, time.monotonic() + delay
+                    )
+                self.retries += 1
+                await asyncio.sleep(delay)
+                work.put_nowait((indices, attempt + 1))
+                return
+        elif status in FATAL_STATUSES:
+            while not work.empty():
+                queued, _ = work.get_nowait()
+                failed.extend(queued)
+                work.task_done()
+        elif status == 400 and len(indices) > 1:
+            # Split to isolate the text the API rejected
+            middle = len(indices) // 2
+            work.put_nowait((indices[:middle], attempt))
+            work.put_nowait((indices[middle:], attempt))
+            return
+        message = payload.get("error", {}).get("message", "")
+        logging.error(
+            f"Giving up on {len(indices)} texts after {attempt + 1} attempts "
+            f"(status {status}): {message}"
+        )
+        last_error.update(status=status, message=message)
+        failed.extend(indices)
+
+    async def _worker(
+        self,
+        work: asyncio.Queue,
+        texts: list[str],
+        vectors: list[list[float] | None],
+        failed: list[int],
+        task_type: str,
+        last_error: dict,
+    ):
+        while True:
+            indices, attempt = await work.get()
+            try:
+                await self._run_batch(
+                    indices,
+                    attempt,
+                    texts,
+                    vectors,
+                    work,
+                    failed,
+                    task_type,
+                    last_error,
+                )
+            finally:
+                work.task_done()
+
+    async def aembed_with_failures(
+        self, texts: list[str], task_type: str | None = None
+    ) -> tuple[list[list[float] | None], list[int]]:
+        """Returns one vector per text (None where it failed) and failed indices."""
+        vectors, failed, _ = await self._aembed(texts, task_type)
+        return (vectors, failed)
+
+    async def _aembed(
+        self, texts: list[str], task_type: str | None
+    ) -> tuple[list[list[float] | None], list[int], dict]:
+        if self._limiter is None:
+            self._limiter = RateLimiter(
+                self.requests_per_minute, self.tokens_per_minute
+            )
+        vectors: list[list[float] | None] = [None] * len(texts)
+        failed: list[int] = []
+        last_error: dict = {}
+        work: asyncio.Queue = asyncio.Queue()
+        for batch in self._pack(list(range(len(texts))), texts):
+            work.put_nowait((batch, 0))
+        workers = [
+            asyncio.create_task(
+                self._worker(
+                    work,
+                    texts,
+                    vectors,
+                    failed,
+                    task_type or self.task_type,
+                    last_error,
+                )
+            )
+            for _ in range(min(self.concurrency, work.qsize()))
+        ]
+        try:
+            await work.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return (vectors, sorted(failed), last_error)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """embed_query for callers already running an event loop.
+
+        The HTTP session and rate limiter bind to the loop that first uses
+        them, so an instance serving this method should not also be driven
+        through the synchronous API.
+        """
+        cache_model = f"{self.model}:RETRIEVAL_QUERY"
+        # The SQLite cache blocks (and may evict), so keep it off the loop
+        if self.cache is not None:
+            vector = (
+                await asyncio.to_thread(self.cache.get_many, cache_model, [text])
+            )[0]
+            if vector is not None:
+                return vector
+        vectors, failed, last_error = await self._aembed([text], "RETRIEVAL_QUERY")
+        if failed:
+            raise EmbeddingFailure(failed, **last_error)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_many, cache_model, [text], vectors)
+        return vectors[0]
+
+    def _run(self, coroutine):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="embedding-scheduler",
+                    daemon=True,
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def embed_with_failures(
+        self, texts: list[str], task_type: str | None = None
+    ) -> tuple[list[list[float] | None], list[int]]:
+        if not texts:
+            return ([], [])
+        if self.cache is None:
+            return self._run(self.aembed_with_failures(texts, task_type))
+        cache_model = f"{self.model}:{task_type or self.task_type}"
+        vectors = self.cache.get_many(cache_model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return (vectors, [])
+        new_vectors, failed = self._run(
+            self.aembed_with_failures([texts[i] for i in missing], task_type)
+        )
+        embedded = [
+            (texts[i], vector)
+            for i, vector in zip(missing, new_vectors)
+            if vector is not None
+        ]
+        if embedded:
+            self.cache.put_many(
+                cache_model,
+                [text for text, _ in embedded],
+                [vector for _, vector in embedded],
+            )
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+        return (vectors, [missing[i] for i in failed])
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, failed = self.embed_with_failures(texts)
+        if failed:
+            raise EmbeddingFailure(failed)
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        vectors, failed = self.embed_with_failures([text], "RETRIEVAL_QUERY")
+        if failed:
+            raise EmbeddingFailure(failed)
+        return vectors[0]
+
+    async def aclose(self):
+        """Closes the session opened by the async API on the caller's loop."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._session is not None:
+            self._run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._session = None
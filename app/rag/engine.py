@@ -0,0 +1,268 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from app.rag.config import EMBEDDING_MODEL
+from app.rag.answer_cache import AnswerCache
+from app.rag.embedding_cache import get_embedding_cache
+from app.rag.embedding_scheduler import EmbeddingScheduler
+from app.rag.bm25 import index_stamp, open_bm25_index
+from app.rag.parent_store import open_parent_store
+from app.rag.latency import StageLatencies
+from app.rag.metrics import observe_stage, register_cache
+from app.rag.rerank import open_reranker
+from app.rag.vector_index import open_vector_index
+
+
+def chunk_id(doc: Document) -> str:
+    """Identifies a retrieved chunk; older ingests predate the chunk_id field."""
+    return doc.metadata.get("chunk_id") or (
+        f"{doc.metadata.get('filename', '')}:{doc.metadata.get('source', '')}"
+    )
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: list[list[Document]], k: int = 60
+) -> list[Document]:
+    """Merges ranked lists by summing 1 / (k + rank) per chunk."""
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = chunk_id(doc)
+            scores[key] = scores.get(key, 0.0) + 1 / (k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class RagEngine:
+    """Embeddings client, vector index and caches shared by all sessions.
+
+    One instance is built per worker process, so the index and client state
+    are loaded once no matter how many ChatState sessions exist. Query
+    embeddings go through one pooled aiohttp session on the server's event
+    loop, and only the CPU-bound index search runs on a small dedicated
+    executor, so a burst of questions waits on I/O rather than on free
+    threads.
+    """
+
+    def __init__(self, api_key: str):
+        self.async_embeddings = EmbeddingScheduler(
+            api_key,
+            model=EMBEDDING_MODEL,
+            concurrency=int(os.environ.get("RAG_EMBED_CONNECTIONS", "32")),
+            max_retries=2,
+            max_delay=5.0,
+            task_type="RETRIEVAL_QUERY",
+            cache=get_embedding_cache(),
+        )
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("RAG_SEARCH_WORKERS", "4")),
+            thread_name_prefix="rag-search",
+        )
+        self.index = open_vector_index()
+        self.lexical_index = open_bm25_index()
+        self._reload_lock = threading.Lock()
+        self.parents = open_parent_store()
+        self.reranker = open_reranker()
+        self.k = int(os.environ.get("RAG_TOP_K", "8"))
+        self.candidates = int(os.environ.get("RAG_CANDIDATES", "20"))
+        self.context_tokens = int(os.environ.get("RAG_CONTEXT_TOKENS", "4000"))
+        self.answer_cache = AnswerCache.from_env()
+        self.latencies = StageLatencies()
+        register_cache("answer", self.answer_cache)
+        register_cache("embedding", get_embedding_cache())
+        self.rerank_budget = float(os.environ.get("RAG_RERANK_BUDGET_MS", "150")) / 1000
+        self.ready = False
+
+    def record_stage(self, stage: str, seconds: float):
+        self.latencies.record(stage, seconds)
+        observe_stage(stage, seconds)
+
+    async def aembed_query(self, question: str) -> list[float]:
+        start = time.perf_counter()
+        embedding = await self.async_embeddings.aembed_query(question)
+        self.record_stage("embed", time.perf_counter() - start)
+        return embedding
+
+    async def asearch(self, question: str, embedding: list[float]) -> list[Document]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.search_executor, self.search, question, embedding
+        )
+
+    async def aretrieve(self, question: str) -> list[Document]:
+        return await self.asearch(question, await self.aembed_query(question))
+
+    def reload_stale_indexes(self):
+        """Reopens the memory-mapped indexes once an ingest has replaced them.
+
+        Chroma and the parent store are read live, so an index left open
+        across an ingest would pair its old rows with the new run's parents.
+        Replaced files stay readable until the old maps are dropped, so
+        searches already running finish against the old index.
+        """
+        if not (self._bm25_stale() or self.index.is_stale()):
+            return
+        with self._reload_lock:
+            if self.index.is_stale():
+                self.index = open_vector_index()
+                logging.info("Reopened the vector index after an ingest.")
+            if self._bm25_stale():
+                self.lexical_index = open_bm25_index()
+                logging.info("Reopened the BM25 index after an ingest.")
+
+    def _bm25_stale(self) -> bool:
+        if self.lexical_index is None:
+            return index_stamp() is not None
+        return self.lexical_index.is_stale()
+
+    def search(self, question: str, embedding: list[float]) -> list[Document]:
+        """Fuses vector and BM25 hits, optionally reranks them, and widens the
+        best `k` to their parents.
+
+        With a reranker, each backend over-fetches `reranker.candidates` so
+        the scorer has more than `k` to choose from. Every stage's duration
+        is recorded in `latencies`.
+        """
+        self.reload_stale_indexes()
+        timings = {}
+        candidates = self.candidates
+        if self.reranker is not None:
+            candidates = max(candidates, self.reranker.candidates)
+        start = time.perf_counter()
+        ranked_lists = [self.index.search(embedding, candidates)]
+        timings["vector"] = time.perf_counter() - start
+        lexical_index = self.lexical_index
+        if lexical_index is not None:
+            start = time.perf_counter()
+            ranked_lists.append(lexical_index.search(question, candidates))
+            timings["bm25"] = time.perf_counter() - start
+        docs = reciprocal_rank_fusion(ranked_lists)
+        if self.reranker is not None:
+            start = time.perf_counter()
+            docs = self.reranker.rerank(
+                question, docs[: self.reranker.candidates], self.k
+            )
+            timings["rerank"] = time.perf_counter() - start
+        docs = docs[: self.k]
+        if self.parents is not None:
+            start = time.perf_counter()
+            docs = self.parents.expand(docs)
+            timings["expand"] = time.perf_counter() - start
+        for stage, seconds in timings.items():
+            self.record_stage(stage, seconds)
+        logging.info(
+            "Retrieval stages: "
+            + ", ".join(f"{stage} {s * 1000:.1f} ms" for stage, s in timings.items())
+        )
+        if "rerank" in timings:
+            rerank_p95 = self.latencies.percentile("rerank", 95)
+            if rerank_p95 > self.rerank_budget:
+                logging.warning(
+                    f"Rerank p95 {rerank_p95 * 1000:.0f} ms is over the "
+                    f"{self.rerank_budget * 1000:.0f} ms budget."
+                )
+        return docs
+
+    async def warm_up(self, queries: list[str], passes: int = 2):
+        """Loads the index and primes every cold path before taking traffic.
+
+        Runs on the server's event loop so the pooled embedding session that
+        chat traffic uses is the one opened here. Reads the index files into
+        the page cache, makes one uncached embedding call, then runs the
+        sample queries until a pass is no slower than the one before it.
+        Only then is `ready` set.
+        """
+        start = time.perf_counter()
+        chunk_count = len(self.index)
+        bytes_read = await asyncio.to_thread(touch_index_files, self.index.files())
+        logging.info(
+            f"Loaded {chunk_count} chunks and read {bytes_read / 1e6:.1f} MB of "
+            f"index files in {time.perf_counter() - start:.2f}s."
+        )
+        if queries:
+            _, failed = await self.async_embeddings.aembed_with_failures(
+                queries[:1], "RETRIEVAL_QUERY"
+            )
+            if failed:
+                logging.warning("Warm-up embedding call failed.")
+        previous_worst = None
+        for warm_up_pass in range(1, passes + 1):
+            latencies = []
+            for query in queries:
+                query_start = time.perf_counter()
+                await self.aretrieve(query)
+                latencies.append(time.perf_counter() - query_start)
+            worst = max(latencies, default=0.0)
+            logging.info(
+                f"Warm-up pass {warm_up_pass}: slowest query {worst * 1000:.0f} ms."
+            )
+            if previous_worst is not None and worst <= previous_worst:
+                break
+            previous_worst = worst
+        self.ready = True
+        logging.info(f"RAG engine ready after {time.perf_counter() - start:.2f}s.")
+
+
+def touch_index_files(paths: list[str]) -> int:
+    """Reads each of `paths` once to pull it into the page cache."""
+    bytes_read = 0
+    for path in paths:
+        try:
+            with open(path, "rb") as index_file:
+                while block := index_file.read(1024 * 1024):
+                    bytes_read += len(block)
+        except OSError as e:
+            logging.warning(f"Could not read index file {path}: {e}")
+    return bytes_read
+
+
+_engine: RagEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_rag_engine() -> RagEngine | None:
+    """Returns the process-wide engine, building it on first use."""
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            api_key = os.environ.get("GOOGLE_API_KEY")
+            if not api_key:
+                logging.error("GOOGLE_API_KEY environment variable not set.")
+                return None
+            try:
+                logging.info("Initializing RAG components...")
+                _engine = RagEngine(api_key)
+                logging.info("RAG components initialized successfully.")
+            except Exception as e:
+                logging.exception(f"Error initializing RAG components: {e}")
+    return _engine
+
+
+def rag_ready() -> bool:
+    return _engine is not None and _engine.ready
+
+
+async def load_rag_engine(warm_up_queries: list[str] = ()):
+    """Lifespan task that builds and warms the shared engine at worker start.
+
+    A failed warm-up (say, the embedding API is briefly down at boot) is
+    retried with backoff, so the worker becomes ready once it recovers.
+    """
+    engine = await asyncio.to_thread(get_rag_engine)
+    if engine is None:
+        return
+    delay = 1.0
+    while True:
+        try:
+            await engine.warm_up(list(warm_up_queries))
+            return
+        except Exception as e:
+            logging.exception(f"RAG warm-up failed, retrying in {delay:.0f}s: {e}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60.0)
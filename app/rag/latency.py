@@ -0,0 +1,28 @@
+import threading
+from collections import defaultdict, deque
+
+
+class StageLatencies:
+    """Rolling window of per-stage durations for percentile reporting."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: dict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def percentile(self, stage: str, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+    def summary(self, q: float = 95) -> dict[str, float]:
+        with self._lock:
+            stages = list(self._samples)
+        return {stage: self.percentile(stage, q) for stage in stages}
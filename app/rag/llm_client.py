@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import logging
+from functools import lru_cache
+from typing import AsyncIterator, Callable
+import aiohttp
+from app.rag.embedding_scheduler import DEFAULT_BASE_URL
+from app.rag.metrics import observe_generation_event
+
+SYSTEM_INSTRUCTION = "You are a professional, helpful AI legal assistant designed to convey the information retrieved from the 'database' below to the user. Answer the user's question based on the following database information. Whenever possible, respond to the user with the verbatim of the database, including the database's citations to the law. For citations, use markdown to *italicize* case names. If the database information does not contain the answer, state that you do not have enough information but can schedule a consultation."
+
+
+def build_context_block(context: str) -> str:
+    return f"Database:\n{context}"
+
+
+def build_question_block(question: str) -> str:
+    return f"Question:\n{question}\n\nAnswer:"
+
+
+def build_prompt(context: str, question: str) -> str:
+    return f"{build_context_block(context)}\n\n{build_question_block(question)}"
+
+
+class GenerationError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Gemini returned {status}: {message}")
+        self.status = status
+
+
+class GenerationBlocked(Exception):
+    """The stream ended without any answer text, usually a safety block."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Gemini returned no answer: {reason}")
+        self.reason = reason
+
+
+async def error_message(response: aiohttp.ClientResponse) -> str:
+    # Proxies and load balancers answer with HTML, not a JSON error body
+    try:
+        payload = await response.json(content_type=None)
+    except ValueError:
+        return response.reason or ""
+    if not isinstance(payload, dict):
+        return response.reason or ""
+    return payload.get("error", {}).get("message", response.reason or "")
+
+
+class GenerationClient:
+    """Long-lived Gemini streaming client shared by every chat session.
+
+    Talks to the streamGenerateContent REST endpoint over one pooled aiohttp
+    session, with the static instructions sent as the system instruction so
+    each request carries only the retrieved context and the question.
+    `base_url` can point at a local stub server. Listeners registered with
+    add_listener receive ("connection_created" | "connection_reused", 0.0),
+    ("first_token", seconds), ("completed", seconds) and
+    ("tokens_per_second", estimated output rate after the first token).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.5-flash",
+        system_instruction: str = SYSTEM_INSTRUCTION,
+        base_url: str | None = None,
+        max_connections: int = 32,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.system_instruction = system_instruction
+        self.base_url = (
+            base_url or os.environ.get("GOOGLE_API_BASE_URL", DEFAULT_BASE_URL)
+        ).rstrip("/")
+        self.max_connections = max_connections
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self._listeners: list[Callable[[str, float], None]] = []
+        self._session: aiohttp.ClientSession | None = None
+
+    @classmethod
+    def from_env(cls, api_key: str) -> "GenerationClient":
+        return cls(
+            api_key,
+            model=os.environ.get("GEMINI_MODEL", "gemini-2.5-flash"),
+            base_url=os.environ.get("GEMINI_API_BASE_URL"),
+            max_connections=int(os.environ.get("GEMINI_MAX_CONNECTIONS", "32")),
+        )
+
+    def add_listener(self, listener: Callable[[str, float], None]):
+        self._listeners.append(listener)
+
+    def _emit(self, event: str, value: float = 0.0):
+        for listener in self._listeners:
+            try:
+                listener(event, value)
+            except Exception as e:
+                logging.exception(f"Generation listener failed on {event}: {e}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+
+            async def on_created(session, context, params):
+                self.connections_created += 1
+                self._emit("connection_created")
+
+            async def on_reused(session, context, params):
+                self.connections_reused += 1
+                self._emit("connection_reused")
+
+            trace_config.on_connection_create_end.append(on_created)
+            trace_config.on_connection_reuseconn.append(on_reused)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=300, sock_connect=10),
+                trace_configs=[trace_config],
+            )
+        return self._session
+
+    async def stream(
+        self, prompt: str, cached_content: str | None = None
+    ) -> AsyncIterator[str]:
+        """Yields the answer text as Gemini streams it.
+
+        With `cached_content`, the system instruction and context come from
+        that cache entry and `prompt` only needs to hold the question.
+        """
+        self.requests += 1
+        start = time.perf_counter()
+        first_token_at = None
+        output_chars = 0
+        block_reason = None
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if cached_content:
+            body["cachedContent"] = cached_content
+        else:
+            body["systemInstruction"] = {"parts": [{"text": self.system_instruction}]}
+        async with self._get_session().post(
+            f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent",
+            params={"alt": "sse"},
+            json=body,
+            headers={"x-goog-api-key": self.api_key},
+        ) as response:
+            if response.status != 200:
+                raise GenerationError(response.status, await error_message(response))
+            async for line in response.content:
+                if not line.startswith(b"data:"):
+                    continue
+                payload = json.loads(line[5:])
+                block_reason = (
+                    payload.get("promptFeedback", {}).get("blockReason") or block_reason
+                )
+                for candidate in payload.get("candidates", [])[:1]:
+                    if candidate.get("finishReason") not in (None, "STOP"):
+                        block_reason = candidate["finishReason"]
+                    text = "".join(
+                        part.get("text", "")
+                        for part in candidate.get("content", {}).get("parts", [])
+                    )
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            self._emit("first_token", first_token_at - start)
+                        output_chars += len(text)
+                        yield text
+        if first_token_at is None:
+            raise GenerationBlocked(block_reason or "empty response")
+        end = time.perf_counter()
+        self._emit("completed", end - start)
+        if first_token_at is not None and end > first_token_at:
+            self._emit("tokens_per_second", output_chars / 4 / (end - first_token_at))
+
+    async def create_cached_content(self, context: str, ttl_seconds: int) -> str:
+        """Caches the system instruction plus `context` and returns its name."""
+        async with self._get_session().post(
+            f"{self.base_url}/v1beta/cachedContents",
+            json={
+                "model": f"models/{self.model}",
+                "systemInstruction": {"parts": [{"text": self.system_instruction}]},
+                "contents": [
+                    {"role": "user", "parts": [{"text": build_context_block(context)}]}
+                ],
+                "ttl": f"{ttl_seconds}s",
+            },
+            headers={"x-goog-api-key": self.api_key},
+        ) as response:
+            if response.status != 200:
+                raise GenerationError(response.status, await error_message(response))
+            return (await response.json(content_type=None))["name"]
+
+    async def delete_cached_content(self, name: str):
+        async with self._get_session().delete(
+            f"{self.base_url}/v1beta/{name}",
+            headers={"x-goog-api-key": self.api_key},
+        ) as response:
+            if response.status not in (200, 404):
+                logging.warning(
+                    f"Could not delete cached content {name}: {response.status}"
+                )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+@lru_cache(maxsize=None)
+def get_generation_client() -> GenerationClient:
+    """Process-wide client; its HTTP session binds to the server's event loop."""
+    client = GenerationClient.from_env(os.environ.get("GOOGLE_API_KEY", ""))
+    client.add_listener(log_generation_event)
+    client.add_listener(observe_generation_event)
+    return client
+
+
+def log_generation_event(event: str, value: float):
+    if event == "first_token":
+        logging.info(f"Gemini time to first token: {value * 1000:.0f} ms.")
+    elif event == "completed":
+        logging.info(f"Gemini answer completed in {value:.2f}s.")
@@ -0,0 +1,126 @@
+import os
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+    write_to_textfile,
+    REGISTRY,
+)
+from prometheus_client.core import CounterMetricFamily
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+QUESTION_STAGE_SECONDS = Histogram(
+    "minerva_stage_seconds",
+    "Time spent in each stage of answering a question.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+GENERATION_TOKENS_PER_SECOND = Histogram(
+    "minerva_generation_tokens_per_second",
+    "Estimated output tokens per second after the first token.",
+    buckets=(5, 10, 25, 50, 100, 200, 400, 800),
+)
+QUESTIONS = Counter("minerva_questions_total", "Questions received.")
+QUESTION_ERRORS = Counter(
+    "minerva_question_errors_total",
+    "Questions that did not get a generated answer, by reason.",
+    ["reason"],
+)
+GENERATION_CONNECTIONS = Counter(
+    "minerva_generation_connections_total",
+    "Gemini HTTP connections opened or reused.",
+    ["event"],
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Time spent in each ingest stage per batch.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_FILES = Counter("ingest_files_total", "Files ingested, by outcome.", ["result"])
+INGEST_CHUNKS = Counter("ingest_chunks_total", "Chunks embedded and written.")
+
+
+class CacheCollector:
+    """Exports the hit and miss counters that the caches already keep.
+
+    Reading them at scrape time keeps the cache hot paths free of metric
+    calls.
+    """
+
+    def __init__(self):
+        self.caches = {}
+
+    def collect(self):
+        family = CounterMetricFamily(
+            "minerva_cache_lookups",
+            "Cache lookups by cache and result.",
+            labels=["cache", "result"],
+        )
+        for name, cache in self.caches.items():
+            family.add_metric([name, "hit"], cache.hits)
+            family.add_metric([name, "miss"], cache.misses)
+        yield family
+
+
+_cache_collector = CacheCollector()
+REGISTRY.register(_cache_collector)
+
+
+def register_cache(name: str, cache):
+    """Exports `cache.hits`/`cache.misses` under the given cache label."""
+    _cache_collector.caches[name] = cache
+
+
+def scrape_registry() -> CollectorRegistry:
+    """This process's metrics, or every worker's when PROMETHEUS_MULTIPROC_DIR is set.
+
+    In multiprocess mode each worker writes its counters and histograms to
+    files in that directory (which must be emptied before the server
+    starts) and a scrape sums them. Cache lookups are read from the caches
+    in memory, so they are only exported by a single-worker server.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def observe_stage(stage: str, seconds: float):
+    QUESTION_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_generation_event(event: str, value: float):
+    """GenerationClient listener feeding TTFT, stream and connection metrics."""
+    if event == "first_token":
+        observe_stage("ttft", value)
+    elif event == "completed":
+        observe_stage("generation", value)
+    elif event == "tokens_per_second":
+        GENERATION_TOKENS_PER_SECOND.observe(value)
+    elif event in ("connection_created", "connection_reused"):
+        GENERATION_CONNECTIONS.labels(event.removeprefix("connection_")).inc()
+
+
+def write_ingest_textfile(path: str):
+    """Writes every metric to `path` for node_exporter's textfile collector."""
+    write_to_textfile(path, REGISTRY)
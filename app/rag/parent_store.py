@@ -0,0 +1,106 @@
+import os
+import logging
+import threading
+from langchain_core.documents import Document
+from app.rag.config import PARENT_STORE_PATH
+from app.rag.sqlite_store import open_sqlite
+
+
+class ParentStore:
+    """SQLite key-value file mapping parent IDs to the page or section text.
+
+    Child chunks are what gets embedded and searched; each carries a
+    `parent_id` in its metadata so a hit can be widened to its parent here.
+    Parents are grouped by source file so re-ingesting or deleting a file
+    replaces all of its parents at once.
+    """
+
+    def __init__(self, path: str = PARENT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parents ("
+            "parent_id TEXT PRIMARY KEY, source_key TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS parents_source_key ON parents (source_key)"
+        )
+
+    def replace_sources(self, parents: dict[str, list[tuple[str, str]]]):
+        """Swaps in the (parent_id, text) pairs of each source key atomically."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for source_key, rows in parents.items():
+                self._conn.execute(
+                    "DELETE FROM parents WHERE source_key = ?", (source_key,)
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO parents VALUES (?, ?, ?)",
+                    [(parent_id, source_key, text) for parent_id, text in rows],
+                )
+            self._conn.execute("COMMIT")
+
+    def delete_sources(self, source_keys: list[str]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM parents WHERE source_key = ?",
+                [(source_key,) for source_key in source_keys],
+            )
+
+    def get_many(self, parent_ids: list[str]) -> dict[str, str]:
+        if not parent_ids:
+            return {}
+        placeholders = ",".join("?" * len(parent_ids))
+        with self._lock:
+            return dict(
+                self._conn.execute(
+                    f"SELECT parent_id, text FROM parents "
+                    f"WHERE parent_id IN ({placeholders})",
+                    parent_ids,
+                ).fetchall()
+            )
+
+    def expand(self, docs: list[Document]) -> list[Document]:
+        """Replaces ranked child chunks with their parents, first hit wins.
+
+        Children sharing a parent collapse into one entry at the rank of the
+        best of them. Chunks without a stored parent are passed through.
+        """
+        parent_texts = self.get_many(
+            list(
+                {
+                    doc.metadata["parent_id"]
+                    for doc in docs
+                    if "parent_id" in doc.metadata
+                }
+            )
+        )
+        expanded = []
+        seen = set()
+        for doc in docs:
+            parent_id = doc.metadata.get("parent_id")
+            if parent_id not in parent_texts:
+                expanded.append(doc)
+                continue
+            if parent_id in seen:
+                continue
+            seen.add(parent_id)
+            expanded.append(
+                Document(
+                    page_content=parent_texts[parent_id],
+                    metadata={
+                        **doc.metadata,
+                        "chunk_id": parent_id,
+                        "matched_chunk_id": doc.metadata.get("chunk_id"),
+                    },
+                )
+            )
+        return expanded
+
+
+def open_parent_store() -> ParentStore | None:
+    if not os.path.exists(PARENT_STORE_PATH):
+        logging.warning("No parent store found; retrieval will use child chunks.")
+        return None
+    return ParentStore()
@@ -0,0 +1,156 @@
+import os
+import math
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol
+from langchain_core.documents import Document
+from app.rag.bm25 import tokenize
+
+
+class Scorer(Protocol):
+    # Whether texts may be scored in independent batches; corpus-relative
+    # scorers need the whole candidate set at once
+    batched: bool
+
+    def score(self, question: str, texts: list[str]) -> list[float]: ...
+
+
+class LexicalScorer:
+    """BM25 over the candidate set itself; needs no model or extra packages."""
+
+    batched = False
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, question: str, texts: list[str]) -> list[float]:
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        scores = [0.0] * len(texts)
+        for term in set(tokenize(question)):
+            doc_freq = sum(1 for counts in term_counts if term in counts)
+            if not doc_freq:
+                continue
+            idf = math.log(1 + (len(texts) - doc_freq + 0.5) / (doc_freq + 0.5))
+            for i, counts in enumerate(term_counts):
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = self.k1 * (
+                        1 - self.b + self.b * lengths[i] / (average_length or 1)
+                    )
+                    scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class OnnxCrossEncoder:
+    """Cross-encoder exported to ONNX, run on CPU with onnxruntime.
+
+    Expects a sequence-classification model taking input_ids, attention_mask
+    and (optionally) token_type_ids, and the matching tokenizer.json from the
+    Hugging Face `tokenizers` library.
+    """
+
+    batched = True
+
+    def __init__(self, model_path: str, tokenizer_path: str, max_length: int = 512):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+    def score(self, question: str, texts: list[str]) -> list[float]:
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch([(question, text) for text in texts])
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(
+            None,
+            {name: array for name, array in inputs.items() if name in self.input_names},
+        )[0]
+        return logits.reshape(len(texts), -1)[:, -1].tolist()
+
+
+class Reranker:
+    """Rescores retrieval candidates and keeps the best `top_n`.
+
+    For batched scorers, candidates are split into batches of `batch_size`
+    that are scored in parallel on a small thread pool; onnxruntime releases
+    the GIL while it runs, so batches genuinely overlap on a multi-core CPU.
+    """
+
+    def __init__(
+        self,
+        scorer: Scorer,
+        candidates: int = 30,
+        batch_size: int = 16,
+        workers: int = 2,
+    ):
+        self.scorer = scorer
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="rerank"
+        )
+
+    def rerank(self, question: str, docs: list[Document], top_n: int) -> list[Document]:
+        if len(docs) <= 1:
+            return docs[:top_n]
+        texts = [doc.page_content for doc in docs]
+        if self.scorer.batched:
+            batches = [
+                texts[start : start + self.batch_size]
+                for start in range(0, len(texts), self.batch_size)
+            ]
+            scores = [
+                score
+                for batch_scores in self._executor.map(
+                    lambda batch: self.scorer.score(question, batch), batches
+                )
+                for score in batch_scores
+            ]
+        else:
+            scores = self.scorer.score(question, texts)
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order[:top_n]]
+
+
+def open_reranker() -> Reranker | None:
+    """Builds the reranker selected by RAG_RERANK (off, lexical or onnx)."""
+    mode = os.environ.get("RAG_RERANK", "off").lower()
+    if mode in ("", "off", "0", "false"):
+        return None
+    scorer: Scorer = LexicalScorer()
+    if mode == "onnx":
+        try:
+            scorer = OnnxCrossEncoder(
+                os.environ["RAG_RERANK_MODEL"], os.environ["RAG_RERANK_TOKENIZER"]
+            )
+        except Exception as e:
+            logging.exception(
+                f"Could not load ONNX reranker, using lexical scoring: {e}"
+            )
+    elif mode != "lexical":
+        logging.warning(f"Unknown RAG_RERANK {mode!r}; using lexical scoring.")
+    return Reranker(
+        scorer,
+        candidates=int(os.environ.get("RAG_RERANK_CANDIDATES", "30")),
+        batch_size=int(os.environ.get("RAG_RERANK_BATCH", "16")),
+        workers=int(os.environ.get("RAG_RERANK_WORKERS", "2")),
+    )
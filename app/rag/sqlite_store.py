@@ -0,0 +1,13 @@
+import os
+import sqlite3
+
+
+def open_sqlite(path: str) -> sqlite3.Connection:
+    """Autocommit WAL connection that threads may share behind their own lock."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(
+        path, check_same_thread=False, isolation_level=None, timeout=30
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
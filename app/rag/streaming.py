@@ -0,0 +1,81 @@
+import os
+import time
+
+
+class DeltaCoalescer:
+    """Buffers streamed model text until it is worth a state update.
+
+    A flush is due once `interval_ms` has passed since the last one or
+    `max_chars` characters are pending, whichever comes first. Each flush
+    takes the state lock once and pushes one delta, instead of one per
+    model chunk.
+    """
+
+    def __init__(self, interval_ms: float = 100, max_chars: int = 400):
+        self.interval = interval_ms / 1000
+        self.max_chars = max_chars
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "DeltaCoalescer":
+        return cls(
+            interval_ms=float(os.environ.get("STREAM_FLUSH_MS", "100")),
+            max_chars=int(os.environ.get("STREAM_FLUSH_CHARS", "400")),
+        )
+
+    def add(self, text: str):
+        self._pending.append(text)
+        self._pending_chars += len(text)
+
+    def should_flush(self) -> bool:
+        return self._pending_chars > 0 and (
+            self._pending_chars >= self.max_chars
+            or time.monotonic() - self._last_flush >= self.interval
+        )
+
+    def take(self) -> str:
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+        return text
+
+
+class MarkdownBlocks:
+    """Splits streamed markdown into finished blocks and the open tail.
+
+    A block is finished at a blank line outside a code fence, once the next
+    line shows it is not an indented continuation (a list item's second
+    paragraph or a code block). Finished blocks never change, so the client
+    can parse each one once and re-parse only `tail` as text arrives.
+    """
+
+    def __init__(self):
+        self.tail = ""
+
+    def add(self, text: str) -> list[str]:
+        """Appends streamed text and returns the blocks it finished."""
+        self.tail += text
+        finished = []
+        block_start = 0
+        position = 0
+        blank_at = None
+        in_fence = False
+        while (end := self.tail.find("\n", position)) != -1:
+            line = self.tail[position:end]
+            if not line.strip():
+                if not in_fence and blank_at is None:
+                    blank_at = position
+            else:
+                if blank_at is not None and not line[0].isspace():
+                    if block := self.tail[block_start:blank_at].strip():
+                        finished.append(block)
+                    block_start = blank_at
+                blank_at = None
+                if line.lstrip().startswith(("```", "~~~")):
+                    in_fence = not in_fence
+            position = end + 1
+        self.tail = self.tail[block_start:].lstrip("\n")
+        return finished
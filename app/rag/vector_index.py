@@ -0,0 +1,169 @@
+import os
+import logging
+from typing import Protocol
+import numpy as np
+from langchain_core.documents import Document
+import chromadb
+from app.rag.chunk_store import (
+    CHUNKS_FILE,
+    OFFSETS_FILE,
+    ChunkStore,
+    iter_collection,
+    write_chunk_store,
+)
+from app.rag.config import CHROMA_DIR, COLLECTION_NAME, NUMPY_INDEX_DIR
+
+VECTORS_FILE = "vectors.npy"
+
+
+class VectorIndex(Protocol):
+    """What RagEngine needs from a vector backend."""
+
+    directory: str
+
+    def search(self, embedding: list[float], k: int) -> list[Document]: ...
+
+    def files(self) -> list[str]:
+        """Paths of the files a search reads, for warming the page cache."""
+        ...
+
+    def is_stale(self) -> bool:
+        """Whether an ingest has replaced the files this index has open."""
+        ...
+
+    def __len__(self) -> int: ...
+
+
+def open_collection():
+    client = chromadb.PersistentClient(path=CHROMA_DIR)
+    return client.get_or_create_collection(
+        name=COLLECTION_NAME, embedding_function=None
+    )
+
+
+class ChromaIndex:
+    def __init__(self):
+        self.directory = CHROMA_DIR
+        self.collection = open_collection()
+
+    def search(self, embedding: list[float], k: int) -> list[Document]:
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            include=["documents", "metadatas"],
+        )
+        return [
+            Document(page_content=text, metadata={**(metadata or {}), "chunk_id": id_})
+            for id_, text, metadata in zip(
+                results["ids"][0], results["documents"][0], results["metadatas"][0]
+            )
+        ]
+
+    def files(self) -> list[str]:
+        # chroma.sqlite3 plus one directory per HNSW segment; the caches and
+        # stores kept alongside it are top-level files and are left out
+        paths = [os.path.join(self.directory, "chroma.sqlite3")]
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                paths.extend(
+                    os.path.join(entry.path, name) for name in os.listdir(entry.path)
+                )
+        return paths
+
+    def is_stale(self) -> bool:
+        # Chroma reads its files live
+        return False
+
+    def __len__(self) -> int:
+        return self.collection.count()
+
+
+class NumpyIndex:
+    """Exact cosine search over a memory-mapped float32 matrix.
+
+    Rows are L2-normalized when the index is built, so a search is one
+    matrix-vector product plus an argpartition for the top k. Chunk text and
+    metadata come from a ChunkStore sidecar. Both are mapped read-only, so
+    every worker process on a host shares one page-cached copy and opening
+    the index takes milliseconds.
+    """
+
+    def __init__(self, directory: str = NUMPY_INDEX_DIR):
+        self.directory = directory
+        self.stamp = self._vectors_stamp()
+        self.vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        self.chunks = ChunkStore(directory)
+
+    def search(self, embedding: list[float], k: int) -> list[Document]:
+        if not len(self):
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.chunks.document(int(row)) for row in top]
+
+    def files(self) -> list[str]:
+        return [
+            os.path.join(self.directory, name)
+            for name in (VECTORS_FILE, CHUNKS_FILE, OFFSETS_FILE)
+        ]
+
+    def _vectors_stamp(self) -> int | None:
+        # build_numpy_index swaps the vectors in after the chunk store
+        try:
+            return os.stat(os.path.join(self.directory, VECTORS_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def is_stale(self) -> bool:
+        return self._vectors_stamp() != self.stamp
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+
+def build_numpy_index(collection, directory: str = NUMPY_INDEX_DIR):
+    """Exports a Chroma collection into the NumpyIndex file layout."""
+    os.makedirs(directory, exist_ok=True)
+    total = collection.count()
+    vectors_path = os.path.join(directory, f"{VECTORS_FILE}.tmp.npy")
+    vectors = None
+    row = 0
+
+    def rows():
+        nonlocal vectors, row
+        for page in iter_collection(collection, include_embeddings=True):
+            page_vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    vectors_path,
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(total, page_vectors.shape[1]),
+                )
+            norms = np.linalg.norm(page_vectors, axis=1, keepdims=True)
+            vectors[row : row + len(page_vectors)] = page_vectors / np.where(
+                norms == 0, 1, norms
+            )
+            row += len(page_vectors)
+            yield from zip(page["ids"], page["documents"], page["metadatas"])
+
+    write_chunk_store(directory, rows())
+    if vectors is None:
+        np.save(vectors_path, np.zeros((0, 0), dtype=np.float32))
+    else:
+        vectors.flush()
+        del vectors
+    os.replace(vectors_path, os.path.join(directory, VECTORS_FILE))
+    logging.info(f"Exported {total} chunks to the NumPy index in {directory}.")
+
+
+def open_vector_index() -> VectorIndex:
+    """Opens the backend named by RAG_INDEX_BACKEND ("chroma" or "numpy")."""
+    backend = os.environ.get("RAG_INDEX_BACKEND", "chroma")
+    if backend == "numpy":
+        return NumpyIndex()
+    return ChromaIndex()
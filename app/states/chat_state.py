@@ -1,20 +1,56 @@
-import reflex as rx
 import os
-import google.generativeai as genai
+import reflex as rx
 import logging
 from typing import TypedDict, Any
+import time
 import asyncio
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_core.retrievers import BaseRetriever
+from functools import lru_cache
+from reflex.utils import prerequisites
+from app.rag.engine import get_rag_engine
+from app.rag.admission import AdmissionRejected
+from app.rag.answer import answer_question
+from app.rag.llm_client import GenerationBlocked
+from app.rag.metrics import QUESTIONS, QUESTION_ERRORS, observe_stage
+from app.rag.streaming import MarkdownBlocks
+from app.states.history_store import get_history_store
+
+DISCLAIMER = "The UCAP information provided by Minerva is for general legal information only and does not constitute legal advice. Do not submit or send any confidential or personal information. No attorney-client relationship is created by using UCAP."
+GREETING = "I am Minerva, the general AI for the Law Office of Alexander S. Chang. I can help you search the legal research database, UCAP. What is your question?"
+HISTORY_WINDOW = int(os.environ.get("CHAT_HISTORY_WINDOW", "20"))
+HISTORY_PAGE = int(os.environ.get("CHAT_HISTORY_PAGE", "20"))
+
+PROMPTS = [
+    "Can a landlord evict a tenant without a court order?",
+    "What is the economic loss doctrine in Utah contract law?",
+    "What is the difference between Chapter 7 and Chapter 13 bankruptcy?",
+]
+
+
+class ClientDisconnected(Exception):
+    """The browser tab that asked the question closed its websocket."""
+
+
+@lru_cache(maxsize=None)
+def get_reflex_app() -> rx.App:
+    # App discovery touches sys.path on every call, so resolve it once
+    return prerequisites.get_and_validate_app().app
+
+
+def client_connected(token: str) -> bool:
+    """Whether the tab holding `token` still has a websocket on this worker."""
+    namespace = get_reflex_app().event_namespace
+    return namespace is None or token in namespace.token_to_sid
 
-try:
-    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-except Exception as e:
-    logging.exception(f"Error configuring Google AI: {e}")
+
+async def save_message(token: str, seq: int, text: str, is_user: bool):
+    try:
+        await asyncio.to_thread(get_history_store().append, token, seq, text, is_user)
+    except Exception as e:
+        logging.exception(f"Could not save chat message: {e}")
 
 
 class Message(TypedDict):
+    seq: int
     text: str
     is_user: bool
 
@@ -22,97 +58,61 @@ class Message(TypedDict):
 class ChatState(rx.State):
     """Manages the chat conversation and RAG logic."""
 
-    messages: list[Message] = [
-        {
-            "text": "The UCAP information provided by Minerva is for general legal information only and does not constitute legal advice. Do not submit or send any confidential or personal information. No attorney-client relationship is created by using UCAP.",
-            "is_user": False,
-        },
-        {
-            "text": "I am Minerva, the general AI for the Law Office of Alexander S. Chang. I can help you search the legal research database, UCAP. What is your question?",
-            "is_user": False,
-        },
-    ]
+    # Only the latest HISTORY_WINDOW messages live in state, so each update
+    # re-sends a bounded list; older ones are paged back from the store
+    messages: list[Message] = []
+    earlier_messages: list[Message] = []
+    message_count: int = 0
+    loaded_from: int = 0
     is_typing: bool = False
     tos_accepted: bool = False
-    prompts: list[str] = [
-        "Can a landlord evict a tenant without a court order?",
-        "What is the economic loss doctrine in Utah contract law?",
-        "What is the difference between Chapter 7 and Chapter 13 bankruptcy?",
-    ]
-    current_prompt_index: int = 0
-    question_input: str = ""
-    is_cycling_prompts: bool = False
-    _vector_store: Chroma | None = None
-    _retriever: BaseRetriever | None = None
-
-    @rx.var
-    def current_prompt_text(self) -> str:
-        """The raw text of the current prompt."""
-        if not self.prompts:
-            return ""
-        return self.prompts[self.current_prompt_index]
-
-    @rx.var
-    def current_prompt_display(self) -> str:
-        """The current placeholder prompt to display with hint."""
-        if not self.prompts:
-            return "Ask your question here..."
-        return f"{self.current_prompt_text} →[Tab]"
-
-    @rx.event
-    def handle_key_down(self, key: str):
-        """Handle key down events in the input."""
-        if key == "Tab":
-            self.question_input = self.current_prompt_text
-            return rx.call_script("event.preventDefault();")
+    # The in-progress answer: finished markdown blocks, which the client
+    # renders once, and the open block still being written
+    stream_blocks: list[str] = []
+    stream_tail: str = ""
 
     @rx.event
     def accept_tos(self):
         """Sets the terms of service as accepted."""
         self.tos_accepted = True
 
-    def _initialize_rag(self):
-        """Initializes the RAG components (vector store and retriever)."""
-        if self._retriever:
+    @rx.var
+    def has_earlier(self) -> bool:
+        """Whether older messages are still in the store, not on screen."""
+        return self.loaded_from > 0
+
+    def _add_message(self, text: str, is_user: bool) -> int:
+        """Appends to the window, trimming it to HISTORY_WINDOW, and returns the seq."""
+        seq = self.message_count
+        self.message_count += 1
+        self.messages.append({"seq": seq, "text": text, "is_user": is_user})
+        if len(self.messages) > HISTORY_WINDOW:
+            self.messages = self.messages[-HISTORY_WINDOW:]
+            # Pages loaded earlier no longer join up with the window
+            if self.earlier_messages:
+                self.earlier_messages = []
+            self.loaded_from = self.message_count - len(self.messages)
+        return seq
+
+    @rx.event
+    async def load_earlier(self):
+        """Pages the previous HISTORY_PAGE messages back in from the store."""
+        if self.loaded_from <= 0:
             return
         try:
-            logging.info("Initializing RAG components...")
-            api_key = os.environ.get("GOOGLE_API_KEY")
-            if not api_key:
-                logging.error("GOOGLE_API_KEY environment variable not set.")
-                return
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001", google_api_key=api_key
-            )
-            self._vector_store = Chroma(
-                collection_name="ultima-collection",
-                persist_directory="chromadata",
-                embedding_function=embeddings,
+            page = await asyncio.to_thread(
+                get_history_store().page,
+                self.router.session.client_token,
+                self.loaded_from,
+                HISTORY_PAGE,
             )
-            self._retriever = self._vector_store.as_retriever(
-                search_type="similarity", search_kwargs={"k": 2}
-            )
-            logging.info("RAG components initialized successfully.")
         except Exception as e:
-            logging.exception(f"Error initializing RAG components: {e}")
-
-    @rx.event(background=True)
-    async def cycle_prompts(self):
-        """Cycles through placeholder prompts in the background."""
-        while self.is_cycling_prompts:
-            async with self:
-                self.current_prompt_index = (self.current_prompt_index + 1) % len(
-                    self.prompts
-                )
-            await asyncio.sleep(4)
-
-    @rx.event
-    async def minerva_page_load(self):
-        """Event handler for when the Minerva page loads."""
-        self._initialize_rag()
-        if not self.is_cycling_prompts:
-            self.is_cycling_prompts = True
-            return ChatState.cycle_prompts
+            logging.exception(f"Could not load earlier messages: {e}")
+            return
+        self.earlier_messages = page + self.earlier_messages
+        self.loaded_from = (
+            self.loaded_from - len(page) if len(page) == HISTORY_PAGE else 0
+        )
 
     @rx.event(background=True)
     async def process_question(self, form_data: dict):
@@ -124,40 +124,70 @@ class ChatState(rx.State):
             if self.is_typing:
                 return
             self.is_typing = True
-            self.messages.append({"text": question, "is_user": True})
-            self.messages.append({"text": "", "is_user": False})
+            question_seq = self._add_message(question, True)
+            token = self.router.session.client_token
+        await save_message(token, question_seq, question, True)
+        answer = ""
+        QUESTIONS.inc()
+        question_start = time.perf_counter()
         try:
-            self._initialize_rag()
-            if not self._retriever:
+            # Building the engine loads indexes and waits on its lock; keep
+            # that off the event loop
+            engine = await asyncio.to_thread(get_rag_engine)
+            if not engine:
                 logging.error("Retriever not initialized.")
+                QUESTION_ERRORS.labels("unavailable").inc()
+                answer = "Error: The document retrieval system is not available."
+                return
+
+            async def show_position(position: int):
+                if not client_connected(token):
+                    raise ClientDisconnected(token)
                 async with self:
-                    self.messages[-1]["text"] = (
-                        "Error: The document retrieval system is not available."
+                    self.stream_tail = (
+                        f"_You are number {position} in line. Your answer will start shortly._"
+                        if position
+                        else ""
                     )
-                    self.is_typing = False
-                return
-            relevant_docs = await asyncio.to_thread(
-                self._retriever.get_relevant_documents, question
-            )
-            context = """
-
-""".join([doc.page_content for doc in relevant_docs])
-            model = genai.GenerativeModel("gemini-2.5-flash")
-            prompt = f"You are a professional, helpful AI legal assistant designed to convey the information retrieved from the 'database' below to the user. Answer the user's question based on the following database information. Whenever possible, respond to the user with the verbatim of the database, including the database's citations to the law. For citations, use markdown to *italicize* case names. If the database information does not contain the answer, state that you do not have enough information but can schedule a consultation.\n\nDatabase:\n{context}\n\nQuestion:\n{question}\n\nAnswer:"
-            stream = await model.generate_content_async(prompt, stream=True)
-            current_text = ""
-            async for chunk in stream:
-                if chunk.text:
-                    current_text += chunk.text
-                    async with self:
-                        self.messages[-1]["text"] = current_text
+
+            blocks = MarkdownBlocks()
+
+            async def show_delta(delta: str):
+                # Stop generating (and free the slot) once nobody is listening
+                if not client_connected(token):
+                    raise ClientDisconnected(token)
+                finished = blocks.add(delta)
+                async with self:
+                    if finished:
+                        self.stream_blocks.extend(finished)
+                    self.stream_tail = blocks.tail
+
+            answer = await answer_question(engine, question, show_delta, show_position)
+        except ClientDisconnected:
+            logging.info("Client disconnected, stopped answering.")
+            QUESTION_ERRORS.labels("disconnected").inc()
+            answer = "_This answer was stopped because the page was closed._"
+        except GenerationBlocked as e:
+            logging.warning(f"No answer generated: {e}")
+            QUESTION_ERRORS.labels("blocked").inc()
+            answer = "Minerva could not answer this question. Please try rephrasing it."
+        except AdmissionRejected as e:
+            logging.warning(f"Shed question under load: {e}")
+            QUESTION_ERRORS.labels("shed").inc()
+            answer = "I'm sorry, I am handling a lot of questions right now. Please try again in a minute."
         except Exception as e:
             logging.exception(f"An error occurred during question processing: {e}")
-            error_message = f"An error occurred: {e}"
-            if "quota" in str(e).lower():
-                error_message = "I'm sorry, I am currently unable to answer questions due to high demand. Please try again later."
-            async with self:
-                self.messages[-1]["text"] = error_message
+            answer = f"An error occurred: {e}"
+            # Embedding and generation failures carry the HTTP status
+            quota = "quota" in str(e).lower() or getattr(e, "status", None) == 429
+            if quota:
+                answer = "I'm sorry, I am currently unable to answer questions due to high demand. Please try again later."
+            QUESTION_ERRORS.labels("quota" if quota else "error").inc()
         finally:
+            observe_stage("total", time.perf_counter() - question_start)
             async with self:
-                self.is_typing = False
\ No newline at end of file
+                answer_seq = self._add_message(answer, False)
+                self.stream_blocks = []
+                self.stream_tail = ""
+                self.is_typing = False
+            await save_message(token, answer_seq, answer, False)
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+from functools import lru_cache
+from app.rag.sqlite_store import open_sqlite
+
+DEFAULT_HISTORY_PATH = os.path.join("chromadata", "chat_history.sqlite3")
+
+
+class HistoryStore:
+    """SQLite file holding every chat message, keyed by client token and seq.
+
+    ChatState only keeps the latest turns in memory; older ones are read
+    back from here a page at a time when the user scrolls up. Sessions
+    untouched for `max_age` seconds are dropped when the store is opened,
+    then at most every `prune_interval` seconds as it is used, so a
+    long-running worker keeps to the same limit.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_HISTORY_PATH,
+        max_age: float = 7 * 86400,
+        prune_interval: float = 3600,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "token TEXT NOT NULL, seq INTEGER NOT NULL, text TEXT NOT NULL, "
+            "is_user INTEGER NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (token, seq)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS messages_created ON messages (created)"
+        )
+        self.prune(max_age)
+
+    def append(self, token: str, seq: int, text: str, is_user: bool):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)",
+                (token, seq, text, int(is_user), time.time()),
+            )
+        self._prune_if_due()
+
+    def page(self, token: str, before: int, limit: int) -> list[dict]:
+        """Up to `limit` messages with seq below `before`, oldest first."""
+        self._prune_if_due()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, text, is_user FROM messages WHERE token = ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (token, before, limit),
+            ).fetchall()
+        return [
+            {"seq": seq, "text": text, "is_user": bool(is_user)}
+            for seq, text, is_user in rows[::-1]
+        ]
+
+    def _prune_if_due(self):
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune(self.max_age)
+
+    def prune(self, max_age: float):
+        with self._lock:
+            self._pruned_at = time.monotonic()
+            self._conn.execute(
+                "DELETE FROM messages WHERE token IN "
+                "(SELECT token FROM messages GROUP BY token HAVING MAX(created) < ?)",
+                (time.time() - max_age,),
+            )
+
+
+@lru_cache(maxsize=None)
+def get_history_store() -> HistoryStore:
+    """Process-wide store configured from CHAT_HISTORY_PATH/_MAX_AGE_DAYS."""
+    return HistoryStore(
+        os.environ.get("CHAT_HISTORY_PATH", DEFAULT_HISTORY_PATH),
+        float(os.environ.get("CHAT_HISTORY_MAX_AGE_DAYS", "7")) * 86400,
+    )
@@ -0,0 +1,42 @@
+// Rotates the example question shown in the Minerva input and fills it in on
+// Tab. Runs entirely in the browser so idle tabs cost the server nothing.
+(function () {
+  const INPUT_ID = "question_input";
+  const INTERVAL_MS = 4000;
+  let index = 0;
+
+  function prompts(input) {
+    try {
+      return JSON.parse(input.dataset.prompts || "[]");
+    } catch (e) {
+      return [];
+    }
+  }
+
+  setInterval(function () {
+    const input = document.getElementById(INPUT_ID);
+    if (!input || document.hidden) return;
+    const list = prompts(input);
+    if (!list.length) return;
+    index = (index + 1) % list.length;
+    input.dataset.prompt = list[index];
+    input.placeholder = list[index] + " →[Tab]";
+  }, INTERVAL_MS);
+
+  document.addEventListener("keydown", function (event) {
+    const input = event.target;
+    // Only an empty input takes the suggestion; otherwise Tab (and any
+    // Shift+Tab) moves focus as usual, e.g. on to the send button
+    if (
+      event.key !== "Tab" ||
+      event.shiftKey ||
+      input.id !== INPUT_ID ||
+      input.value ||
+      !input.dataset.prompt
+    ) {
+      return;
+    }
+    event.preventDefault();
+    input.value = input.dataset.prompt;
+  });
+})();
@@ -0,0 +1,60 @@
+import os
+import random
+
+TOPICS = {
+    "eviction": "landlord tenant eviction notice unlawful detainer possession court order rent default lease termination",
+    "contracts": "contract breach economic loss doctrine damages consideration warranty performance remedy negligence",
+    "bankruptcy": "bankruptcy chapter 7 chapter 13 discharge trustee creditor repayment plan exemption petition",
+    "probate": "probate estate will executor heir intestate succession guardianship trust beneficiary",
+    "employment": "employment wage termination discrimination overtime retaliation employer employee claim",
+    "property": "property easement boundary title deed adverse possession quiet title mortgage lien",
+}
+FILLER = "the of and to in a is that for on with as by this court under section shall may".split()
+QUESTION_TEMPLATES = [
+    "What does Utah law say about {a} and {b}?",
+    "Can a {a} be challenged without {b}?",
+    "How is {a} handled when there is {b}?",
+    "What is the rule for {a} in a {b} case?",
+]
+
+
+def generate_corpus(directory: str, files: int, pages_per_file: int = 4, seed: int = 0):
+    """Writes `files` synthetic statute-like text files under `directory`."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    topics = list(TOPICS)
+    for number in range(files):
+        topic = topics[number % len(topics)]
+        vocabulary = TOPICS[topic].split()
+        pages = []
+        for page in range(pages_per_file):
+            paragraphs = []
+            for paragraph in range(rng.randint(4, 8)):
+                citation = f"{rng.randint(10, 78)}-{rng.randint(1, 30)}-{rng.randint(100, 999)}"
+                words = [
+                    (
+                        rng.choice(vocabulary)
+                        if rng.random() < 0.35
+                        else rng.choice(FILLER)
+                    )
+                    for _ in range(rng.randint(60, 160))
+                ]
+                paragraphs.append(f"Section {citation}. " + " ".join(words) + ".")
+            pages.append("\n\n".join(paragraphs))
+        with open(
+            os.path.join(directory, f"{topic}-{number:05d}.txt"), "w", encoding="utf-8"
+        ) as file:
+            file.write("\n\n\n".join(pages))
+
+
+def generate_questions(count: int, seed: int = 0) -> list[str]:
+    """Distinct questions spread over the corpus topics."""
+    rng = random.Random(seed)
+    questions = []
+    for number in range(count):
+        vocabulary = TOPICS[rng.choice(list(TOPICS))].split()
+        a, b = rng.sample(vocabulary, 2)
+        questions.append(
+            f"{rng.choice(QUESTION_TEMPLATES).format(a=a, b=b)} (case {number})"
+        )
+    return questions
@@ -0,0 +1,316 @@
+"""Simulates concurrent /minerva chat sessions against a running Reflex backend.
+
+Start the stubs and a backend that talks to them, then step through
+session counts to get a capacity curve:
+
+    python -m benchmarks.stubs --port 8765
+    GOOGLE_API_KEY=x GOOGLE_API_BASE_URL=http://127.0.0.1:8765 \\
+        reflex run --env prod --backend-only
+    python -m benchmarks.loadgen --url http://localhost:8000 --steps 1,4,16,64
+
+Each session connects over the /_event websocket like a browser tab,
+hydrates /minerva and then asks questions through process_question on a
+Poisson arrival schedule. Time to first streamed token and full-answer
+latency are measured from the client side.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import statistics
+import socketio
+from benchmarks.corpus import generate_questions
+from benchmarks.rag_bench import PERCENTILES, RESULTS_DIR, current_commit
+
+ROOT_STATE = "reflex___state____state"
+CHAT_STATE = f"{ROOT_STATE}.app___states___chat_state____chat_state"
+FIELD_MARKER = "_rx_state_"
+EVENT_NAMESPACE = "/_event"
+QUEUE_MESSAGE_PREFIX = "_You are number"
+SHED_MESSAGE_PREFIX = "I'm sorry"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class ChatSession:
+    """One simulated browser tab holding a websocket to the backend."""
+
+    def __init__(self, url: str, page: str = "/minerva"):
+        self.url = url.rstrip("/")
+        self.page = page
+        self.token = str(uuid.uuid4())
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.client.on("event", self._on_update, namespace=EVENT_NAMESPACE)
+        self.last_answer = ""
+        self._marks: dict[str, float] = {}
+        self._done = asyncio.Event()
+
+    async def _on_update(self, update):
+        if isinstance(update, str):
+            update = json.loads(update)
+        delta = update.get("delta", {}).get(CHAT_STATE, {})
+        now = time.perf_counter()
+        if delta.get(f"is_typing{FIELD_MARKER}") is True:
+            self._marks.setdefault("ack", now)
+        stream_tail = delta.get(f"stream_tail{FIELD_MARKER}")
+        if stream_tail and stream_tail.startswith(QUEUE_MESSAGE_PREFIX):
+            self._marks.setdefault("queued", now)
+        elif stream_tail or delta.get(f"stream_blocks{FIELD_MARKER}"):
+            self._marks.setdefault("ttft", now)
+        messages = delta.get(f"messages{FIELD_MARKER}")
+        if messages and not messages[-1].get("is_user"):
+            self.last_answer = messages[-1].get("text", "")
+        if delta.get(f"is_typing{FIELD_MARKER}") is False and "ack" in self._marks:
+            self._marks.setdefault("total", now)
+            self._done.set()
+
+    async def connect(self):
+        await self.client.connect(
+            f"{self.url}?token={self.token}",
+            socketio_path="_event",
+            transports=["websocket"],
+            namespaces=[EVENT_NAMESPACE],
+        )
+
+    async def send(self, handler: str, payload: dict | None = None):
+        await self.client.emit(
+            "event",
+            {
+                "token": self.token,
+                "name": handler,
+                "payload": payload or {},
+                "router_data": {
+                    "pathname": self.page,
+                    "asPath": self.page,
+                    "query": {},
+                },
+            },
+            namespace=EVENT_NAMESPACE,
+        )
+
+    async def open_page(self):
+        await self.send(f"{ROOT_STATE}.hydrate")
+
+    async def ask(self, question: str, timeout: float) -> dict:
+        """Submits one question and returns its latencies in seconds."""
+        self._marks = {}
+        self._done.clear()
+        self.last_answer = ""
+        start = time.perf_counter()
+        await self.send(
+            f"{CHAT_STATE}.process_question", {"form_data": {"question": question}}
+        )
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+            outcome = classify_answer(self.last_answer)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        result = {"outcome": outcome, "queued": "queued" in self._marks}
+        for mark in ("ack", "ttft", "total"):
+            if mark in self._marks:
+                result[mark] = self._marks[mark] - start
+        return result
+
+    async def close(self):
+        await self.client.disconnect()
+
+
+def classify_answer(answer: str) -> str:
+    if answer.startswith(SHED_MESSAGE_PREFIX):
+        return "shed"
+    if answer.startswith(("Error:", "An error occurred")):
+        return "error"
+    return "ok"
+
+
+async def run_session(
+    url: str,
+    questions: list[str],
+    think_time: float,
+    timeout: float,
+    rng: random.Random,
+) -> list[dict]:
+    session = ChatSession(url)
+    try:
+        await session.connect()
+        await session.open_page()
+    except Exception as e:
+        return [{"outcome": "connect_failed", "error": str(e)}]
+    results = []
+    try:
+        for number, question in enumerate(questions):
+            if number and think_time:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+            results.append(await session.ask(question, timeout))
+    finally:
+        await session.close()
+    return results
+
+
+async def run_step(
+    url: str,
+    sessions: int,
+    questions_per_session: int,
+    arrival_rate: float,
+    think_time: float,
+    timeout: float,
+    seed: int,
+) -> dict:
+    """Runs one load level: `sessions` users arriving as a Poisson process."""
+    rng = random.Random(seed)
+    questions = generate_questions(sessions * questions_per_session, seed)
+    tasks = []
+    start = time.perf_counter()
+    for number in range(sessions):
+        tasks.append(
+            asyncio.create_task(
+                run_session(
+                    url,
+                    questions[number::sessions],
+                    think_time,
+                    timeout,
+                    random.Random(rng.random()),
+                )
+            )
+        )
+        if arrival_rate and number < sessions - 1:
+            await asyncio.sleep(rng.expovariate(arrival_rate))
+    results = [result for session in await asyncio.gather(*tasks) for result in session]
+    seconds = time.perf_counter() - start
+    outcomes: dict[str, int] = {}
+    for result in results:
+        outcomes[result["outcome"]] = outcomes.get(result["outcome"], 0) + 1
+    answered = [result for result in results if result["outcome"] == "ok"]
+    step = {
+        "sessions": sessions,
+        "questions": len(results),
+        "seconds": round(seconds, 3),
+        "answers_per_second": round(len(answered) / seconds, 2),
+        "outcomes": outcomes,
+        "queued": sum(result.get("queued", False) for result in results),
+    }
+    for mark in ("ack", "ttft", "total"):
+        samples = [result[mark] for result in answered if mark in result]
+        step[f"{mark}_ms"] = {
+            f"p{q}": round(percentile(samples, q) * 1000, 1) for q in PERCENTILES
+        }
+        if samples:
+            step[f"{mark}_ms"]["mean"] = round(statistics.fmean(samples) * 1000, 1)
+    return step
+
+
+def within_slo(step: dict, ttft_slo: float, error_budget: float) -> bool:
+    failed = step["questions"] - step["outcomes"].get("ok", 0)
+    return (
+        step["ttft_ms"]["p95"] <= ttft_slo * 1000
+        and failed <= error_budget * step["questions"]
+    )
+
+
+def print_curve(
+    curve: list[dict], ttft_slo: float, error_budget: float, header: bool = True
+):
+    if header:
+        print(
+            f"{'sessions':>9}{'answers/s':>11}{'ack p95':>10}{'ttft p50':>10}"
+            f"{'ttft p95':>10}{'total p95':>11}{'queued':>8}{'failed':>8}"
+        )
+    for step in curve:
+        failed = step["questions"] - step["outcomes"].get("ok", 0)
+        print(
+            f"{step['sessions']:>9}{step['answers_per_second']:>11}"
+            f"{step['ack_ms']['p95']:>10}{step['ttft_ms']['p50']:>10}"
+            f"{step['ttft_ms']['p95']:>10}{step['total_ms']['p95']:>11}"
+            f"{step['queued']:>8}{failed:>8}"
+            + ("" if within_slo(step, ttft_slo, error_budget) else "  over SLO")
+        )
+
+
+def print_capacity(curve: list[dict], ttft_slo: float, error_budget: float):
+    healthy = [
+        step["sessions"] for step in curve if within_slo(step, ttft_slo, error_budget)
+    ]
+    if healthy:
+        print(f"Highest level within p95 TTFT {ttft_slo}s: {max(healthy)} sessions")
+    else:
+        print(f"No level stayed within p95 TTFT {ttft_slo}s")
+
+
+async def run_curve(args) -> list[dict]:
+    curve = []
+    for number, sessions in enumerate(args.steps):
+        step = await run_step(
+            args.url,
+            sessions,
+            args.questions_per_session,
+            args.arrival_rate,
+            args.think_time,
+            args.timeout,
+            args.seed + number,
+        )
+        curve.append(step)
+        print_curve([step], args.ttft_slo, args.error_budget, header=not number)
+        if args.cooldown:
+            await asyncio.sleep(args.cooldown)
+    return curve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument(
+        "--steps",
+        type=lambda value: [int(part) for part in value.split(",")],
+        default=[1, 2, 4, 8, 16, 32],
+        help="comma separated concurrent session counts",
+    )
+    parser.add_argument("--questions-per-session", type=int, default=3)
+    parser.add_argument(
+        "--arrival-rate",
+        type=float,
+        default=5.0,
+        help="new sessions per second, 0 opens them all at once",
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=2.0, help="mean seconds between questions"
+    )
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--cooldown", type=float, default=2.0)
+    parser.add_argument("--ttft-slo", type=float, default=2.0)
+    parser.add_argument("--error-budget", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    curve = asyncio.run(run_curve(args))
+    print()
+    print_curve(curve, args.ttft_slo, args.error_budget)
+    print_capacity(curve, args.ttft_slo, args.error_budget)
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"loadgen-{current_commit()}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "commit": current_commit(),
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "config": vars(args),
+                    "curve": curve,
+                },
+                file,
+                indent=2,
+            )
+        print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
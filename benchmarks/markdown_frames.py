@@ -0,0 +1,141 @@
+"""Per-update markdown parse cost of the streaming answer bubble.
+
+    python -m benchmarks.markdown_frames --paragraphs 60 --slowdown 6
+
+Streams a synthetic multi-page legal answer in coalesced deltas and, for
+every state update, times what the browser has to parse: the whole answer
+so far (re-rendering one markdown component) against only the newly
+finished blocks plus the open tail (app.rag.streaming.MarkdownBlocks with
+memoized block components). markdown-it-py stands in for the browser's
+markdown parser, so absolute numbers are a proxy; --slowdown scales them
+to approximate a low-end phone when counting frames over budget.
+"""
+
+import time
+import random
+import argparse
+from markdown_it import MarkdownIt
+from app.rag.streaming import MarkdownBlocks
+from benchmarks.corpus import TOPICS
+from benchmarks.rag_bench import PERCENTILES
+
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def generate_answer(paragraphs: int, seed: int = 0) -> str:
+    """A long markdown answer shaped like Minerva's: prose, citations and lists."""
+    rng = random.Random(seed)
+    words = " ".join(TOPICS.values()).split()
+    blocks = ["## Summary"]
+    for number in range(paragraphs):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(40, 90)))
+        citation = f"Utah Code {rng.randint(10, 78)}-{rng.randint(1, 30)}-{rng.randint(100, 999)}"
+        case = f"*{rng.choice(words).title()} v. {rng.choice(words).title()}*"
+        kind = number % 6
+        if kind == 3:
+            blocks.append(
+                "\n".join(
+                    f"{item + 1}. **{rng.choice(words).title()}**: {sentence[:120]} ({citation})."
+                    for item in range(rng.randint(3, 6))
+                )
+            )
+        elif kind == 5:
+            blocks.append(f"> {sentence.capitalize()}. See {case}, {citation}.")
+        else:
+            blocks.append(f"{sentence.capitalize()}. See {case}; {citation}.")
+        if number and number % 15 == 0:
+            blocks.append(f"### {rng.choice(words).title()} issues")
+    return "\n\n".join(blocks) + "\n"
+
+
+def stream_deltas(answer: str, flush_chars: int) -> list[str]:
+    return [answer[i : i + flush_chars] for i in range(0, len(answer), flush_chars)]
+
+
+def time_full(md: MarkdownIt, deltas: list[str]) -> list[float]:
+    frames = []
+    text = ""
+    for delta in deltas:
+        text += delta
+        start = time.perf_counter()
+        md.render(text)
+        frames.append((time.perf_counter() - start) * 1000)
+    return frames
+
+
+def time_incremental(md: MarkdownIt, deltas: list[str]) -> list[float]:
+    frames = []
+    blocks = MarkdownBlocks()
+    for delta in deltas:
+        start = time.perf_counter()
+        for block in blocks.add(delta):
+            md.render(block)
+        md.render(blocks.tail)
+        frames.append((time.perf_counter() - start) * 1000)
+    return frames
+
+
+def summarize(frames: list[float], slowdown: float) -> dict:
+    ordered = sorted(frames)
+    summary = {
+        f"p{q}": ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+        for q in PERCENTILES
+    }
+    summary["max"] = ordered[-1]
+    summary["total"] = sum(frames)
+    summary["over_budget"] = sum(
+        1 for frame in frames if frame * slowdown > FRAME_BUDGET_MS
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=60)
+    parser.add_argument("--flush-chars", type=int, default=120)
+    parser.add_argument(
+        "--slowdown",
+        type=float,
+        default=6.0,
+        help="CPU slowdown applied when counting frames over the 60fps budget",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    answer = generate_answer(args.paragraphs, args.seed)
+    deltas = stream_deltas(answer, args.flush_chars)
+    md = MarkdownIt("commonmark")
+    results = {}
+    for name, run in (("full", time_full), ("incremental", time_incremental)):
+        # Keep the fastest pass to cut noise from other processes
+        results[name] = min((run(md, deltas) for _ in range(args.repeat)), key=sum)
+
+    print(
+        f"{len(answer)} chars in {len(deltas)} updates of {args.flush_chars} chars, "
+        f"{args.slowdown}x slowdown against a {FRAME_BUDGET_MS:.1f} ms frame"
+    )
+    print(
+        f"{'renderer':<13}"
+        + "".join(f"{f'p{q} ms':>10}" for q in PERCENTILES)
+        + f"{'max ms':>10}{'total ms':>11}{'over budget':>13}"
+    )
+    summaries = {
+        name: summarize(frames, args.slowdown) for name, frames in results.items()
+    }
+    for name, summary in summaries.items():
+        print(
+            f"{name:<13}"
+            + "".join(f"{summary[f'p{q}']:>10.3f}" for q in PERCENTILES)
+            + f"{summary['max']:>10.3f}{summary['total']:>11.1f}"
+            + f"{summary['over_budget']:>13}"
+        )
+    print(
+        f"Incremental parsing does {summaries['full']['total'] / summaries['incremental']['total']:.1f}x "
+        f"less work per answer; its p95 update is "
+        f"{summaries['full']['p95'] / summaries['incremental']['p95']:.1f}x cheaper."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Offline benchmark of ingest and the question path against local API stubs.
+
+    python -m benchmarks.rag_bench --files 200 --questions 300 --concurrency 16
+
+Builds a synthetic corpus, ingests it through app.googleingest, then
+replays concurrent questions through app.rag.answer.answer_question with
+Gemini replaced by benchmarks.stubs. Results are printed and saved as JSON
+under benchmarks/results/ named after the current commit, so runs on
+different commits can be compared with --compare.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import resource
+import subprocess
+import psutil
+from benchmarks.corpus import generate_corpus, generate_questions
+from benchmarks.stubs import StubConfig, start_stub_server_thread
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+PERCENTILES = (50, 95, 99)
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1e6
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """High-water RSS from the kernel; RUSAGE_CHILDREN gives the largest child."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak * 1024 / 1e6
+
+
+def run_ingest(corpus_dir: str, workers: int, mode: str) -> dict:
+    from app import googleingest
+    from app.rag.vector_index import open_collection
+
+    os.environ["DOCS_ROOT_PATH"] = corpus_dir
+    os.environ["INGEST_WORKERS"] = str(workers)
+    os.environ["INGEST_MODE"] = mode
+    start = time.perf_counter()
+    googleingest.main()
+    seconds = time.perf_counter() - start
+    files = len(os.listdir(corpus_dir))
+    chunks = open_collection().count()
+    return {
+        "seconds": round(seconds, 3),
+        "files": files,
+        "chunks": chunks,
+        "files_per_second": round(files / seconds, 2),
+        "chunks_per_second": round(chunks / seconds, 2),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+async def replay_questions(questions: list[str], concurrency: int) -> dict:
+    from app.rag.answer import answer_question
+    from app.rag.engine import RagEngine
+    from app.rag.latency import StageLatencies
+    from app.rag.llm_client import get_generation_client
+
+    engine = RagEngine(os.environ["GOOGLE_API_KEY"])
+    engine.latencies = StageLatencies(window=len(questions) * 2)
+    client = get_generation_client()
+
+    def record_generation(event: str, value: float):
+        if event == "first_token":
+            engine.latencies.record("ttft", value)
+        elif event == "completed":
+            engine.latencies.record("generation", value)
+
+    client.add_listener(record_generation)
+    pending = iter(questions)
+    errors: dict[str, int] = {}
+    output_chars = 0
+
+    async def worker():
+        nonlocal output_chars
+        for question in pending:
+            start = time.perf_counter()
+            try:
+                answer = await answer_question(engine, question, _ignore_delta)
+                output_chars += len(answer)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            engine.latencies.record("total", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    await client.close()
+    await engine.async_embeddings.aclose()
+    return {
+        "count": len(questions),
+        "concurrency": concurrency,
+        "seconds": round(seconds, 3),
+        "questions_per_second": round(len(questions) / seconds, 2),
+        "output_tokens_per_second": round(output_chars / 4 / seconds, 1),
+        "errors": errors,
+        "stages_ms": {
+            stage: {
+                f"p{q}": round(engine.latencies.percentile(stage, q) * 1000, 2)
+                for q in PERCENTILES
+            }
+            for stage in engine.latencies.summary()
+        },
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+async def _ignore_delta(delta: str):
+    pass
+
+
+def print_report(results: dict, baseline: dict | None):
+    ingest = results["ingest"]
+    replay = results["questions"]
+    print(f"\nCommit {results['commit']}")
+    print(
+        f"Ingest: {ingest['files']} files / {ingest['chunks']} chunks in "
+        f"{ingest['seconds']}s ({ingest['chunks_per_second']} chunks/s)"
+    )
+    line = (
+        f"Questions: {replay['count']} at concurrency {replay['concurrency']} in "
+        f"{replay['seconds']}s ({replay['questions_per_second']} q/s)"
+    )
+    if baseline:
+        before = baseline["questions"]["questions_per_second"]
+        line += f", baseline {before} q/s ({_change(before, replay['questions_per_second'])})"
+    print(line)
+    if replay["errors"]:
+        print(f"Errors: {replay['errors']}")
+    print(f"{'stage':<12}" + "".join(f"{f'p{q} ms':>12}" for q in PERCENTILES))
+    for stage, values in replay["stages_ms"].items():
+        row = f"{stage:<12}" + "".join(f"{values[f'p{q}']:>12}" for q in PERCENTILES)
+        previous = (baseline or {}).get("questions", {}).get("stages_ms", {}).get(stage)
+        if previous:
+            row += f"   p95 {_change(previous['p95'], values['p95'])}"
+        print(row)
+    print(
+        f"Peak RSS: {results['peak_rss_mb']} MB, "
+        f"largest ingest worker {results['peak_worker_rss_mb']} MB"
+    )
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ingest-workers", type=int, default=2)
+    parser.add_argument("--ingest-mode", choices=["batch", "pipeline"], default="batch")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.4)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--answer-cache", action="store_true")
+    parser.add_argument("--workdir", help="defaults to a fresh temporary directory")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    stub_config = StubConfig(
+        embed_latency=args.embed_latency,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+    )
+    base_url = start_stub_server_thread(stub_config)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="minerva-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    os.environ.update(
+        {
+            "GOOGLE_API_KEY": "benchmark",
+            "GOOGLE_API_BASE_URL": base_url,
+            "GEMINI_API_BASE_URL": base_url,
+            "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+            "ANONYMIZED_TELEMETRY": "False",
+        }
+    )
+    if not args.answer_cache:
+        os.environ["ANSWER_CACHE_MAX_ENTRIES"] = "0"
+    corpus_dir = os.path.join(workdir, "corpus")
+    generate_corpus(corpus_dir, args.files)
+
+    ingest = run_ingest(corpus_dir, args.ingest_workers, args.ingest_mode)
+    questions = asyncio.run(
+        replay_questions(generate_questions(args.questions), args.concurrency)
+    )
+    results = {
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {**vars(args), "stub": vars(stub_config)},
+        "ingest": ingest,
+        "questions": questions,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_worker_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_report(results, baseline)
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, REPO_ROOT)
+    main()
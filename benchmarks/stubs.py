@@ -0,0 +1,180 @@
+"""Local stand-ins for the Gemini embedding and streaming generation APIs.
+
+Run standalone with `python -m benchmarks.stubs --port 8765` and point
+GOOGLE_API_BASE_URL at it, or start it in-process with start_stub_server.
+"""
+
+import re
+import json
+import math
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass
+from aiohttp import web
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class StubConfig:
+    dimensions: int = 256
+    embed_latency: float = 0.05
+    ttft: float = 0.4
+    tokens_per_second: float = 80.0
+    answer_tokens: int = 200
+    chunk_tokens: int = 8
+    quota_error_rate: float = 0.0
+    # Every embedding request fails with this status (0 to disable)
+    embed_error_status: int = 0
+    # Embedding batches containing this exact text are rejected with a 400
+    rejected_text: str = ""
+    seed: int = 0
+
+
+def embed_text(text: str, dimensions: int) -> list[float]:
+    """Hashed bag-of-words vector, so texts sharing words land close together."""
+    vector = [0.0] * dimensions
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimensions
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def build_app(config: StubConfig) -> web.Application:
+    rng = random.Random(config.seed)
+    cached_contents: dict[str, dict] = {}
+
+    def quota_error() -> web.Response | None:
+        if config.quota_error_rate and rng.random() < config.quota_error_rate:
+            return web.json_response(
+                {"error": {"message": "Resource exhausted: check quota."}},
+                status=429,
+            )
+        return None
+
+    async def batch_embed(request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(config.embed_latency)
+        if error := quota_error():
+            return error
+        if config.embed_error_status:
+            return web.json_response(
+                {"error": {"message": "Stub embedding error."}},
+                status=config.embed_error_status,
+            )
+        texts = [item["content"]["parts"][0]["text"] for item in body["requests"]]
+        if config.rejected_text and config.rejected_text in texts:
+            return web.json_response(
+                {"error": {"message": "Invalid text in batch."}}, status=400
+            )
+        return web.json_response(
+            {
+                "embeddings": [
+                    {"values": embed_text(text, config.dimensions)} for text in texts
+                ]
+            }
+        )
+
+    async def stream_generate(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if error := quota_error():
+            return error
+        cached = body.get("cachedContent")
+        if cached and cached not in cached_contents:
+            return web.json_response(
+                {"error": {"message": f"{cached} not found."}}, status=404
+            )
+        prompt = body["contents"][-1]["parts"][0]["text"]
+        words = WORD_PATTERN.findall(prompt.lower()) or ["answer"]
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(config.ttft)
+        interval = config.chunk_tokens / config.tokens_per_second
+        for start in range(0, config.answer_tokens, config.chunk_tokens):
+            text = " ".join(
+                words[i % len(words)]
+                for i in range(
+                    start, min(start + config.chunk_tokens, config.answer_tokens)
+                )
+            )
+            payload = {"candidates": [{"content": {"parts": [{"text": text + " "}]}}]}
+            await response.write(f"data: {json.dumps(payload)}\r\n\r\n".encode())
+            await asyncio.sleep(interval)
+        await response.write_eof()
+        return response
+
+    async def create_cached_content(request: web.Request) -> web.Response:
+        name = f"cachedContents/stub-{len(cached_contents) + 1}"
+        cached_contents[name] = await request.json()
+        return web.json_response({"name": name})
+
+    async def delete_cached_content(request: web.Request) -> web.Response:
+        cached_contents.pop(f"cachedContents/{request.match_info['name']}", None)
+        return web.json_response({})
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/v1beta/models/{model}:batchEmbedContents", batch_embed)
+    app.router.add_post("/v1beta/models/{model}:streamGenerateContent", stream_generate)
+    app.router.add_post("/v1beta/cachedContents", create_cached_content)
+    app.router.add_delete("/v1beta/cachedContents/{name}", delete_cached_content)
+    return app
+
+
+async def start_stub_server(
+    config: StubConfig, host: str = "127.0.0.1", port: int = 0
+) -> tuple[web.AppRunner, str]:
+    """Starts the stubs on the running loop and returns the runner and base URL."""
+    runner = web.AppRunner(build_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return (runner, f"http://{host}:{bound_port}")
+
+
+def start_stub_server_thread(config: StubConfig) -> str:
+    """Serves the stubs from a daemon thread so synchronous code can call them."""
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    result = {}
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        result["runner"], result["base_url"] = loop.run_until_complete(
+            start_stub_server(config)
+        )
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="gemini-stub", daemon=True).start()
+    started.wait()
+    return result["base_url"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.4)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--quota-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = StubConfig(
+        embed_latency=args.embed_latency,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        quota_error_rate=args.quota_error_rate,
+    )
+    web.run_app(build_app(config), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
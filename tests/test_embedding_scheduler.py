@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from benchmarks.stubs import StubConfig, start_stub_server
+from app.rag.embedding_scheduler import EmbeddingFailure, EmbeddingScheduler
+
+TEXTS = [f"text number {i}" for i in range(40)]
+
+
+async def embed(config: StubConfig, texts: list[str], **kwargs):
+    """Runs one aembed_with_failures call against a fresh stub server."""
+    runner, base_url = await start_stub_server(config)
+    scheduler = EmbeddingScheduler(
+        "test-key",
+        base_url=base_url,
+        batch_size=4,
+        concurrency=2,
+        base_delay=0.01,
+        max_delay=0.05,
+        **kwargs,
+    )
+    try:
+        vectors, failed = await scheduler.aembed_with_failures(texts)
+    finally:
+        await scheduler.aclose()
+        await runner.cleanup()
+    return scheduler, vectors, failed
+
+
+class EmbeddingSchedulerTest(unittest.TestCase):
+    def test_embeds_every_text(self):
+        scheduler, vectors, failed = asyncio.run(
+            embed(StubConfig(embed_latency=0), TEXTS)
+        )
+        self.assertEqual(failed, [])
+        self.assertTrue(all(vector for vector in vectors))
+        self.assertEqual(scheduler.requests_sent, len(TEXTS) // 4)
+
+    def test_retries_quota_errors(self):
+        config = StubConfig(embed_latency=0, quota_error_rate=0.5, seed=1)
+        scheduler, vectors, failed = asyncio.run(embed(config, TEXTS, max_retries=20))
+        self.assertEqual(failed, [])
+        self.assertTrue(all(vector for vector in vectors))
+        self.assertGreater(scheduler.retries, 0)
+
+    def test_gives_up_after_max_retries(self):
+        config = StubConfig(embed_latency=0, quota_error_rate=1.0)
+        scheduler, vectors, failed = asyncio.run(
+            embed(config, TEXTS[:4], max_retries=2)
+        )
+        self.assertEqual(failed, [0, 1, 2, 3])
+        self.assertEqual(scheduler.requests_sent, 3)
+
+    def test_splits_batches_to_isolate_a_rejected_text(self):
+        config = StubConfig(embed_latency=0, rejected_text=TEXTS[5])
+        scheduler, vectors, failed = asyncio.run(embed(config, TEXTS))
+        self.assertEqual(failed, [5])
+        self.assertIsNone(vectors[5])
+        self.assertTrue(all(vector for i, vector in enumerate(vectors) if i != 5))
+
+    def test_fails_every_batch_on_a_fatal_status(self):
+        for status in (401, 403, 404):
+            with self.subTest(status=status):
+                config = StubConfig(embed_latency=0, embed_error_status=status)
+                scheduler, vectors, failed = asyncio.run(embed(config, TEXTS))
+                self.assertEqual(failed, list(range(len(TEXTS))))
+                # Only the batches already in flight are sent
+                self.assertLessEqual(scheduler.requests_sent, 2)
+
+    def test_query_failure_carries_the_status(self):
+        async def embed_query():
+            runner, base_url = await start_stub_server(
+                StubConfig(embed_latency=0, quota_error_rate=1.0)
+            )
+            scheduler = EmbeddingScheduler(
+                "test-key", base_url=base_url, max_retries=1, max_delay=0.01
+            )
+            try:
+                await scheduler.aembed_query("question")
+            finally:
+                await scheduler.aclose()
+                await runner.cleanup()
+
+        with self.assertRaises(EmbeddingFailure) as raised:
+            asyncio.run(embed_query())
+        self.assertEqual(raised.exception.status, 429)
+
+
+if __name__ == "__main__":
+    unittest.main()